@@ -14,6 +14,16 @@
 # parts of the algorithms: the same sort of pairs for:
 # Sainte-Laguë, largest-remainders Hare, and adjusted-divisor Webster
 #
+# Args (optional):
+# rules -- instead, tabulates every valid configuration of the degressive-proportionality
+#   rules in PropAllocDegressive.py: Cambridge compromise, parabolic, and power compromise,
+#   over base seats 0 to MinSeats and the total seats
+# Minimum total seats for the rules (default: actual total - 30)
+# Maximum total seats for the rules (default: actual total + 30)
+# Returns, for the rules:
+# header line
+# list of (rule, parameter, base, total, divisor, seats for each member)
+#
 # Apportionment in the European Parliament - Wikipedia
 # https://en.wikipedia.org/wiki/Apportionment_in_the_European_Parliament
 #
@@ -44,6 +54,23 @@ indx = {}
 for k,ln in enumerate(Members):
 	indx[ln[0]] = k
 
+if len(sys.argv) > 1 and sys.argv[1] == "rules":
+	from PropAllocDegressive import SweepRules
+	MinTotal = int(sys.argv[2]) if len(sys.argv) > 2 else NumSeats - 30
+	MaxTotal = int(sys.argv[3]) if len(sys.argv) > 3 else NumSeats + 30
+	Rules = [("Cambridge", None), ("Parabolic", None)] + \
+		[("Power", 0.05*k) for k in range(10,20)]
+	Rows = SweepRules([m[:2] for m in Members], Rules, range(0,MinSeats+1), \
+		range(MinTotal,MaxTotal+1), MinSeats=MinSeats, MaxSeats=MaxSeats)
+	
+	print('\t'.join(["Rule", "Param", "Base", "Total", "Divisor"] + [m[0] for m in Members]))
+	for RuleName, Param, Base, Total, Out in Rows:
+		if not Out["Valid"]: continue
+		Seats = {r[0]: r[2] for r in Out["Res"]}
+		print('\t'.join([RuleName, "" if Param == None else "%.2f" % Param, str(Base), \
+			str(Total), "%.1f" % Out["Divisor"]] + [str(Seats[m[0]]) for m in Members]))
+	sys.exit()
+
 
 Votes0 = AddInitial(Members,0)
 NumSeats0 = NumSeats - MinSeats*len(Votes0)
@@ -8,11 +8,13 @@
 # Returns:
 # header line
 # list of (name, votes, allocation in each of the algorithms)
+# disproportionality metrics: (name, blank, value in each of the algorithms)
 
 import sys
 from PropAlloc import HighestAverages, HA_Divisors, AddInitial
 from PropAlloc import LargestRemainders, LR_QuotaAdjust
 from PropAlloc import AdjustDivisor, AD_Rounding
+from PropAlloc import BatchMetrics, MetricNames
 
 infile = sys.argv[1]
 NumSeats = int(sys.argv[2])
@@ -71,4 +73,9 @@ for Name, Method in MethodList:
 
 print('\t'.join(Names))
 for ln in d:
-	print('\t'.join([str(s) for s in ln]))
\ No newline at end of file
+	print('\t'.join([str(s) for s in ln]))
+
+SeatMatrix = [[ln[k] for ln in d] for k in range(2,len(Names))]
+Metrics = BatchMetrics([ln[1] for ln in d], SeatMatrix)
+for MetricName in MetricNames:
+	print('\t'.join([MetricName, ""] + ["%.4f" % m[MetricName] for m in Metrics]))
\ No newline at end of file
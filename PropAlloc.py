@@ -26,6 +26,12 @@
 #   MinSeats is each party's minimum number of seats: specified as MinSeats=(value)
 #   MaxSeats is each party's maximum number of seats: specified as MaxSeats=(value)
 #
+# HighestAverages, QuotaMethod, LargestRemainder, AdjustDivisor, and AllocByName also accept
+#   Threshold: the electoral threshold: specified as Threshold=(value)
+#     a fraction of the total votes, or an associative array of party: fraction,
+#     for different thresholds, like higher ones for alliances.
+#   The parties below it get no seats, with direction -1, and the others get all of them.
+#
 # Minimum and maximum values were implemented to make possible "degressive proportionality"
 # https://en.wikipedia.org/wiki/Degressive_proportionality
 # avoiding too little or too much representation for each party or region.
@@ -55,6 +61,40 @@
 # Jefferson, DHondt -- s + 1
 # Imperiali -- s + 2
 #
+# LevelingSeats(DivisorFunc, Votes, TotalSeats, Initial)
+# Leveling seats for mixed-member systems: the house grows from TotalSeats
+# until every party's highest-averages allocation reaches its fixed seats (district seats)
+# Votes: (party, # votes, # fixed seats)
+# Initial is each party's initial number of seats, as for AddInitial (default 0)
+# Returns (house size, output list)
+#
+# HighestAveragesFrom(DivisorFunc, Votes, TotalSeats, StartSeats, MaxSeats)
+# Highest averages starting from a nearby allocation, like one for slightly different
+# votes or a slightly different total, instead of from the initial seats.
+# StartSeats: associative array of each party's starting number of seats;
+# parties not in it start with their initial seats.
+# Seats are added, removed, and exchanged until no party's next average
+# is above another party's last average, giving the same result as HighestAverages
+# except that exact ties may go differently.
+#
+# HA_PowerSweep(DivisorFunc, Votes, TotalSeats, ExpMin, ExpMax, MaxSeats)
+# Highest averages with each party's votes raised to a power, for all powers
+# from ExpMin to ExpMax: the power-law (Penrose) family of allocations
+# Votes: (party, # votes, # initial seats), with votes > 0
+# Returns a list of (power, output list) for each change of allocation or direction:
+# each allocation holds from its power up to the next one's.
+# The output lists have the original votes. At the power of a change,
+# the parties that gain and lose seats are tied.
+#
+# QuotaMethod(DivisorFunc, Votes, TotalSeats, MinSeats, MaxSeats)
+# Divisor method constrained to quota: seats are given one at a time
+# to the highest average among the parties still below their upper quota
+# for the new number of seats. Votes: (party, # votes)
+# With HA_Divisors["DHondt"], it is the Balinski-Young quota method,
+# which stays within quota and gives no party fewer seats as TotalSeats increases.
+# With the others, it stays within upper quota.
+# If MaxSeats leaves no party within upper quota, the seat goes to the highest average.
+#
 #
 # LargestRemainder(QuotaAdjust, Votes, TotalSeats, MinSeats, MaxSeats)
 # LargestRemainders( (same args) )
@@ -78,6 +118,121 @@
 # Webster -- nearest (0)
 # Adams -- upward (1)
 #
+#
+# Optimal apportionment:
+#
+# OptimalApportionment(Objective, Votes, TotalSeats, MinSeats, MaxSeats)
+# The allocation with the smallest value of an objective, from MinSeats to MaxSeats for each party
+# Votes: (party, # votes)
+# Objective: (aggregate, cost function of (# votes, # seats, TotalSeats/(total votes)))
+#   "Sum": minimizes the sum of the parties' costs;
+#     the function is the change in cost from # seats to # seats + 1
+#   "Max": minimizes the largest of the parties' costs;
+#     the function is the cost of # seats
+# Each party's cost must be convex in its seats: its changes in cost must not decrease.
+# The result is then exact, with ties going to the earlier party in Votes.
+# Starting from the parties' lowest costs, it moves only the seats needed to reach TotalSeats,
+# so it is fast for many parties and many seats.
+#
+# OA_Objectives: an associative array
+#   Key: name, Value: objective
+# With q the quota, (# votes) * TotalSeats/(total votes), and s the number of seats:
+# LoosemoreHanby -- sum of abs(s - q): largest remainders (Hamilton)
+# Gallagher -- sum of (s - q)^2: largest remainders (Hamilton)
+# SainteLague -- sum of (s - q)^2/q: Sainte-Lague (Webster)
+# RelSquared -- sum of ((s - q)/q)^2
+# DHondt -- max of s/q: D'Hondt (Jefferson)
+# MaxDeviation -- max of abs(s - q)
+# MaxRelative -- max of abs(s - q)/q
+#
+# DivisorObjective(DivisorFunc)
+# The objective for a highest-averages divisor function, as in HA_Divisors:
+# OptimalApportionment with it gives HighestAverages' allocation,
+# with MinSeats as the initial seats, except that exact ties may go differently.
+#
+#
+# AllocByName(MethodName, Votes, TotalSeats, MinSeats, MaxSeats)
+# Uses a method name: "HA-(HA_Divisors name)", "LR-(LR_QuotaAdjust name)",
+# "AD-(AD_Rounding name)", "QM-(HA_Divisors name)" for QuotaMethod,
+# or "OA-(OA_Objectives name)" for OptimalApportionment,
+# like "HA-DHondt", "LR-Droop", "AD-Webster", "QM-DHondt", "OA-MaxDeviation"
+# Votes: (party, # votes)
+# For highest averages, MinSeats is the initial number of seats (default 0)
+#
+# ThresholdSweep(MethodName, Votes, TotalSeats, ThreshMin, ThreshMax, MinSeats, MaxSeats)
+# The allocations for all thresholds from ThreshMin to ThreshMax, as fractions of the total votes.
+# The parties are sorted by votes once and dropped one at a time as the threshold rises;
+# for highest averages, each allocation starts from the previous one with HighestAveragesFrom.
+# Returns a list of (low threshold, high threshold, output list) for each different allocation:
+# it holds for thresholds above the low one up to the high one (the first one from ThreshMin).
+# The directions are for the lowest thresholds that it holds for.
+#
+#
+# Disproportionality metrics:
+#
+# AllocMetrics(Res)
+# Uses a method's output list: (party, # votes, # seats, direction)
+#
+# BatchMetrics(VoteCounts, SeatMatrix)
+# VoteCounts is a list of numbers of votes,
+# SeatMatrix is a list of lists of numbers of seats, each in the order of VoteCounts
+# Returns a list of the metrics for each one
+#
+# The metrics are an associative array, with keys MetricNames
+# Shares of the votes and seats are fractions, not percentages
+# Gallagher -- sqrt( sum of (seat share - vote share)^2 / 2 )
+# LoosemoreHanby -- sum of abs(seat share - vote share) / 2
+# SainteLague -- sum of (seat share - vote share)^2 / (vote share)
+# DHondt -- max of (seat share) / (vote share)
+# ENPVotes -- effective number of parties by votes: 1 / sum of (vote share)^2
+# ENPSeats -- effective number of parties by seats: 1 / sum of (seat share)^2
+# Parties with no votes are left out of SainteLague and DHondt
+#
+#
+# Ties:
+# HighestAverages, QuotaMethod, LargestRemainder, AdjustDivisor, and OptimalApportionment
+# accept Ties=(associative array)
+# If there is a tie for the deciding seat or seats, it gets
+#   Parties: the tied parties
+#   Winners: the tied parties that got a seat from the tie in the output
+#   Seats: the number of seats that the tied parties contend for
+# If there is no tie, all these are empty or zero.
+# For adjusted divisor, the output then may not have TotalSeats seats.
+# For QuotaMethod, a tie can decide which parties are below their upper quota
+# for the seats after it, so every choice at every tied step is followed.
+# Parties are those whose seats differ between the valid allocations,
+# Winners those with more than their fewest, and Seats the number of those extra seats.
+# Ties also gets
+#   Allocations: for each valid allocation, associative array of tied party: seats
+#
+# CountTiedAllocations(Ties)
+# The number of valid allocations under the tie
+#
+# TiedAllocations(Res, Ties)
+# Generates each valid allocation from a method's output list Res and its Ties
+# With Allocations, those are the valid allocations, otherwise every choice
+# of Seats of the Parties
+#
+#
+# Seats-votes curves:
+# The number of seats of one party as a function of its votes,
+# with the other parties' votes held fixed.
+# The steps are found from the divisors or the quotas, not by sampling.
+#
+# HA_SeatsVotesCurve(DivisorFunc, Votes, Party, VoteMin, VoteMax, TotalSeats, MaxSeats)
+# Votes as for HighestAverages: (party, # votes, # initial seats)
+#
+# LR_SeatsVotesCurve(QuotaAdjust, Votes, Party, VoteMin, VoteMax, TotalSeats, MinSeats, MaxSeats)
+# Votes as for LargestRemainder: (party, # votes)
+#
+# Party's own votes in Votes are ignored. If it is absent, it is treated as a new party
+# (with no initial seats for highest averages).
+# Output: list of (# votes, # seats) for each step from VoteMin to VoteMax:
+# the party has that number of seats from those votes up to the next step's votes.
+# At exactly a step's votes, the party is tied with another party for that seat.
+# For largest remainders with MinSeats or MaxSeats, the quota steps of the parties
+# left unforced are also used, and the steps are then found by bisection.
+#
 # Examples is a collection of examples from these Wikipedia articles
 # and various referenced articles
 #
@@ -93,7 +248,9 @@
 # https://www.pnas.org/content/77/1/1 - The Webster method of apportionment
 #
 
-from math import sqrt, floor, ceil
+from math import sqrt, floor, ceil, inf, comb, log
+from heapq import heapify, heappush, heappop
+from itertools import combinations
 
 
 # Add constant initial allocation:
@@ -149,11 +306,46 @@ def SortKeyFinal(a):
 	# Seats, total votes, party name
 	return (-a[2],-a[1],a[0])
 
+# For reporting ties for the deciding seat
+def ClearTies(Ties):
+	if Ties == None: return
+	Ties.clear()
+	Ties["Parties"] = []
+	Ties["Winners"] = []
+	Ties["Seats"] = 0
+
+def IsTied(a, b, Scale):
+	return a == b or abs(a - b) <= 1e-12*Scale
+
+# Electoral threshold: the parties at or above it, and the others with no seats
+def SplitThreshold(Votes, Threshold):
+	TotalVotes = sum(Vote[1] for Vote in Votes)
+	Passed = []
+	Failed = []
+	for Vote in Votes:
+		PartyThreshold = Threshold.get(Vote[0],0) if isinstance(Threshold, dict) else Threshold
+		if Vote[1] >= PartyThreshold*TotalVotes:
+			Passed.append(Vote)
+		else:
+			Failed.append([Vote[0], Vote[1], 0, -1])
+	return (Passed, Failed)
+
+# Allocates with AllocFunc(Passed) among the parties at or above the threshold
+def AllocAboveThreshold(AllocFunc, Votes, Threshold):
+	Passed, Failed = SplitThreshold(Votes, Threshold)
+	Res = AllocFunc(Passed) if len(Passed) > 0 else []
+	return sorted(Res + Failed, key=SortKeyFinal)
+
 
 # Highest-averages method
 
-def HighestAverages(DivisorFunc, Votes, TotalSeats, *, MaxSeats=None):
+def HighestAverages(DivisorFunc, Votes, TotalSeats, *, MaxSeats=None, Ties=None, \
+		Threshold=None):
 	IsMax = MaxSeats != None
+	ClearTies(Ties)
+	if Threshold != None:
+		return AllocAboveThreshold(lambda Passed: HighestAverages(DivisorFunc, Passed, \
+			TotalSeats, MaxSeats=MaxSeats, Ties=Ties), Votes, Threshold)
 	
 	# VList members have party, votes, seats, direction, averages
 	VList = [list(Vote[:3]) + [0, 0] for Vote in Votes]
@@ -174,6 +366,7 @@ def HighestAverages(DivisorFunc, Votes, TotalSeats, *, MaxSeats=None):
 		return [Vote[:4] for Vote in sorted(VList,key=SortKeyFinal)]
 	
 	# Any seats remaining?
+	LastAvg = None
 	while RemainingSeats > 0:
 		# Find the highest average by index
 		ix = None
@@ -198,13 +391,394 @@ def HighestAverages(DivisorFunc, Votes, TotalSeats, *, MaxSeats=None):
 			Vote[3] = 1
 		else:
 			# If not, then a seat to the winner
+			LastAvg = HighAvg
 			Vote[2] += 1
 			RemainingSeats -= 1
 			Vote[4] = Vote[1]/float(DivisorFunc(Vote[2]))
 	
+	# Ties: the parties whose last seat or next seat has the last seat's average
+	if Ties != None and LastAvg != None:
+		Scale = abs(LastAvg)
+		Winners = []
+		Losers = []
+		for Vote, InVote in zip(VList, Votes):
+			InitSeats = min(InVote[2], MaxSeats) if IsMax else InVote[2]
+			if Vote[2] > InitSeats and \
+					IsTied(Vote[1]/float(DivisorFunc(Vote[2]-1)), LastAvg, Scale):
+				Winners.append(Vote[0])
+			elif Vote[3] == 0 and not (IsMax and Vote[2] >= MaxSeats) and \
+					IsTied(Vote[4], LastAvg, Scale):
+				Losers.append(Vote[0])
+		if len(Losers) > 0:
+			Ties["Parties"] = Winners + Losers
+			Ties["Winners"] = Winners
+			Ties["Seats"] = len(Winners)
+	
+	return [Vote[:4] for Vote in sorted(VList,key=SortKeyFinal)]
+
+
+# Highest averages from a nearby allocation
+
+def HighestAveragesFrom(DivisorFunc, Votes, TotalSeats, StartSeats, *, MaxSeats=None):
+	IsMax = MaxSeats != None
+	
+	def Average(NumVotes, Seats):
+		Dvsr = DivisorFunc(Seats)
+		return NumVotes/float(Dvsr) if Dvsr > 0 else inf
+	
+	# VList members have party, votes, seats, direction, initial seats
+	VList = []
+	for Vote in Votes:
+		InitSeats = min(Vote[2], MaxSeats) if IsMax else Vote[2]
+		Seats = max(StartSeats.get(Vote[0], InitSeats), InitSeats)
+		if IsMax: Seats = min(Seats, MaxSeats)
+		Dir = 1 if IsMax and Vote[2] > MaxSeats else 0
+		VList.append([Vote[0], Vote[1], Seats, Dir, InitSeats])
+	SeatSum = sum(Vote[2] for Vote in VList)
+	
+	def HighestNext():
+		ix = None
+		for k, Vote in enumerate(VList):
+			if IsMax and Vote[2] >= MaxSeats: continue
+			Avg = Average(Vote[1], Vote[2])
+			if ix == None or Avg > HighAvg:
+				ix = k
+				HighAvg = Avg
+		return (ix, HighAvg) if ix != None else (None, None)
+	
+	def LowestLast():
+		ix = None
+		for k, Vote in enumerate(VList):
+			if Vote[2] <= Vote[4]: continue
+			Avg = Average(Vote[1], Vote[2]-1)
+			if ix == None or Avg <= LowAvg:
+				ix = k
+				LowAvg = Avg
+		return (ix, LowAvg) if ix != None else (None, None)
+	
+	while True:
+		if SeatSum < TotalSeats:
+			ix, HighAvg = HighestNext()
+			if ix == None: break
+			VList[ix][2] += 1
+			SeatSum += 1
+		elif SeatSum > TotalSeats:
+			ix, LowAvg = LowestLast()
+			if ix == None: break
+			VList[ix][2] -= 1
+			SeatSum -= 1
+		else:
+			ixh, HighAvg = HighestNext()
+			ixl, LowAvg = LowestLast()
+			if ixh == None or ixl == None or not HighAvg > LowAvg: break
+			VList[ixh][2] += 1
+			VList[ixl][2] -= 1
+	
+	# Forced to the maximum if the next seat would have won,
+	# or if there are seats left over
+	if IsMax:
+		ixl, LowAvg = LowestLast()
+		if ixl != None:
+			for Vote in VList:
+				if Vote[2] >= MaxSeats and (SeatSum < TotalSeats or \
+						Average(Vote[1], Vote[2]) > LowAvg):
+					Vote[3] = 1
+	
 	return [Vote[:4] for Vote in sorted(VList,key=SortKeyFinal)]
 
 
+# Power-law sweep
+# The log of each average is a straight line in the power:
+# (power) * log(votes) - log(divisor)
+# so the allocation changes only where a party's last seat's line
+# crosses another party's next seat's line.
+
+def HA_PowerSweep(DivisorFunc, Votes, TotalSeats, ExpMin, ExpMax, *, MaxSeats=None):
+	IsMax = MaxSeats != None
+	
+	def LogDvsr(Seats):
+		Dvsr = DivisorFunc(Seats)
+		return log(Dvsr) if Dvsr > 0 else -inf
+	
+	NumParties = len(Votes)
+	Slopes = [log(Vote[1]) for Vote in Votes]
+	InitSeats = [min(Vote[2], MaxSeats) if IsMax else Vote[2] for Vote in Votes]
+	
+	# Comparing lines just after the power Exp: by value, then by slope
+	def LineKey(k, Seats, Exp):
+		return (Exp*Slopes[k] - LogDvsr(Seats), Slopes[k])
+	
+	def IsAbove(Key1, Key2):
+		if IsTied(Key1[0], Key2[0], 1. + abs(Key1[0])):
+			return Key1[1] > Key2[1]
+		return Key1[0] > Key2[0]
+	
+	def CanGain(k, Seats):
+		return not IsMax or Seats[k] < MaxSeats
+	
+	# The initial allocation: the largest averages, as negative keys
+	Seats = list(InitSeats)
+	AvgHeap = []
+	for k in range(NumParties):
+		if CanGain(k, Seats):
+			Key = LineKey(k, Seats[k], ExpMin)
+			AvgHeap.append((-Key[0], -Key[1], k))
+	heapify(AvgHeap)
+	RemainingSeats = TotalSeats - sum(Seats)
+	while RemainingSeats > 0 and len(AvgHeap) > 0:
+		k = heappop(AvgHeap)[2]
+		Seats[k] += 1
+		RemainingSeats -= 1
+		if CanGain(k, Seats):
+			Key = LineKey(k, Seats[k], ExpMin)
+			heappush(AvgHeap, (-Key[0], -Key[1], k))
+	
+	def OutputList(Seats, Exp):
+		# Forced to the maximum if the next seat would have won
+		LastKeys = [LineKey(k, Seats[k]-1, Exp) for k in range(NumParties) \
+			if Seats[k] > InitSeats[k]]
+		if len(LastKeys) > 0:
+			LowKey = min(LastKeys, key=lambda Key: (Key[0], Key[1]))
+		VList = []
+		for k, Vote in enumerate(Votes):
+			Dir = 0
+			if not CanGain(k, Seats) and len(LastKeys) > 0 and \
+					IsAbove(LineKey(k, Seats[k], Exp), LowKey):
+				Dir = 1
+			VList.append([Vote[0], Vote[1], Seats[k], Dir])
+		return sorted(VList, key=SortKeyFinal)
+	
+	Steps = [(ExpMin, OutputList(Seats, ExpMin))]
+	Exp = ExpMin
+	while True:
+		# The next crossing of a last seat's line by a next seat's line,
+		# including the next seats of parties at the maximum, for their directions
+		NextExp = inf
+		for i in range(NumParties):
+			if Seats[i] <= InitSeats[i]: continue
+			LogDvsrI = LogDvsr(Seats[i]-1)
+			for j in range(NumParties):
+				if Slopes[j] == Slopes[i]: continue
+				if CanGain(j, Seats) and Slopes[j] < Slopes[i]: continue
+				LogDvsrJ = LogDvsr(Seats[j])
+				if LogDvsrI == -inf or LogDvsrJ == -inf: continue
+				CrossExp = (LogDvsrJ - LogDvsrI)/(Slopes[j] - Slopes[i])
+				if CrossExp > Exp and not IsTied(CrossExp, Exp, 1. + abs(Exp)) \
+						and CrossExp < NextExp:
+					NextExp = CrossExp
+		if NextExp > ExpMax: break
+		Exp = NextExp
+		
+		# Exchange seats until every last seat's line is above every next seat's line
+		while True:
+			Losers = [k for k in range(NumParties) if Seats[k] > InitSeats[k]]
+			Gainers = [k for k in range(NumParties) if CanGain(k, Seats)]
+			if len(Losers) == 0 or len(Gainers) == 0: break
+			i = min(Losers, key=lambda k: LineKey(k, Seats[k]-1, Exp))
+			j = max(Gainers, key=lambda k: LineKey(k, Seats[k], Exp))
+			if not IsAbove(LineKey(j, Seats[j], Exp), LineKey(i, Seats[i]-1, Exp)): break
+			Seats[i] -= 1
+			Seats[j] += 1
+		Res = OutputList(Seats, Exp)
+		if Res != Steps[-1][1]:
+			Steps.append((Exp, Res))
+	
+	return Steps
+
+
+# Quota-constrained divisor methods
+# The averages are in a heap, and parties at their upper quota are set aside
+# until the next seat is given
+
+def QuotaMethod(DivisorFunc, Votes, TotalSeats, *, MinSeats=None, MaxSeats=None, \
+		Ties=None, Threshold=None):
+	IsMin = MinSeats != None
+	IsMax = MaxSeats != None
+	ClearTies(Ties)
+	if Threshold != None:
+		return AllocAboveThreshold(lambda Passed: QuotaMethod(DivisorFunc, Passed, \
+			TotalSeats, MinSeats=MinSeats, MaxSeats=MaxSeats, Ties=Ties), Votes, Threshold)
+	
+	# VList members have party, votes, seats, direction
+	VList = [list(Vote[:2]) + [MinSeats if IsMin else 0, 0] for Vote in Votes]
+	TotalVotes = sum(Vote[1] for Vote in VList)
+	HouseSize = sum(Vote[2] for Vote in VList)
+	
+	def Average(Vote):
+		Dvsr = DivisorFunc(Vote[2])
+		return Vote[1]/float(Dvsr) if Dvsr > 0 else inf
+	
+	# Negative averages, for finding the largest; ties go by list order
+	AvgHeap = [(-Average(Vote), k) for k, Vote in enumerate(VList)]
+	heapify(AvgHeap)
+	AtQuota = []
+	
+	# Ties: the seats at the first tied step, for following each choice from there
+	TieStart = None
+	
+	while HouseSize < TotalSeats:
+		ix = None
+		while len(AvgHeap) > 0:
+			Entry = heappop(AvgHeap)
+			Vote = VList[Entry[1]]
+			if IsMax and Vote[2] >= MaxSeats:
+				Vote[2] = MaxSeats
+				Vote[3] = 1
+			elif Vote[2]*TotalVotes < Vote[1]*(HouseSize + 1):
+				ix = Entry[1]
+				break
+			else:
+				AtQuota.append(Entry)
+		
+		# All below their maximum are at their upper quota?
+		IsPastQuota = ix == None
+		if IsPastQuota:
+			if len(AtQuota) == 0: break
+			Entry = min(AtQuota)
+			AtQuota.remove(Entry)
+			ix = Entry[1]
+		
+		if Ties != None and TieStart == None:
+			Avg = -Entry[0]
+			if IsPastQuota:
+				IsTiedStep = any(QM_IsTied(-Other[0], Avg) for Other in AtQuota)
+			else:
+				IsTiedStep = False
+				Popped = []
+				while len(AvgHeap) > 0 and QM_IsTied(-AvgHeap[0][0], Avg):
+					Other = heappop(AvgHeap)
+					Popped.append(Other)
+					OtherVote = VList[Other[1]]
+					if not (IsMax and OtherVote[2] >= MaxSeats) and \
+							OtherVote[2]*TotalVotes < OtherVote[1]*(HouseSize + 1):
+						IsTiedStep = True
+						break
+				for Other in Popped:
+					heappush(AvgHeap, Other)
+			if IsTiedStep:
+				TieStart = [Vote[2] for Vote in VList]
+		
+		Vote = VList[ix]
+		Vote[2] += 1
+		HouseSize += 1
+		heappush(AvgHeap, (-Average(Vote), ix))
+		for Entry in AtQuota:
+			heappush(AvgHeap, Entry)
+		AtQuota = []
+	
+	if IsMin:
+		for Vote in VList:
+			if Vote[2] == MinSeats and Vote[1]*TotalSeats < MinSeats*TotalVotes:
+				Vote[3] = -1
+	
+	if TieStart != None:
+		QM_FillTies(Ties, DivisorFunc, VList, TotalVotes, TotalSeats, TieStart, MaxSeats)
+	
+	return sorted(VList, key=SortKeyFinal)
+
+
+# Quota method ties: from the seats at the first tied step, each choice among
+# the tied parties is followed, since the winner of one tied seat can change
+# which parties are below their upper quota for the next one.
+# The same seats reached by different choices are followed only once.
+
+def QM_FillTies(Ties, DivisorFunc, VList, TotalVotes, TotalSeats, StartSeats, MaxSeats):
+	IsMax = MaxSeats != None
+	NumParties = len(VList)
+	
+	def Average(k, Seats):
+		Dvsr = DivisorFunc(Seats[k])
+		return VList[k][1]/float(Dvsr) if Dvsr > 0 else inf
+	
+	def Choices(Seats):
+		HouseSize = sum(Seats)
+		if HouseSize >= TotalSeats: return []
+		Open = [k for k in range(NumParties) if not (IsMax and Seats[k] >= MaxSeats)]
+		Below = [k for k in Open if Seats[k]*TotalVotes < VList[k][1]*(HouseSize + 1)]
+		if len(Below) == 0: Below = Open
+		if len(Below) == 0: return []
+		Avgs = {k: Average(k, Seats) for k in Below}
+		Best = max(Avgs.values())
+		return [k for k in Below if QM_IsTied(Avgs[k], Best)]
+	
+	Finals = []
+	Seen = set()
+	Stack = [tuple(StartSeats)]
+	while len(Stack) > 0:
+		Seats = Stack.pop()
+		if Seats in Seen: continue
+		Seen.add(Seats)
+		Next = Choices(Seats)
+		if len(Next) == 0:
+			Finals.append(Seats)
+		for k in reversed(Next):
+			Stack.append(Seats[:k] + (Seats[k] + 1,) + Seats[k+1:])
+	if len(Finals) <= 1: return
+	
+	Varying = [k for k in range(NumParties) if len(set(Final[k] for Final in Finals)) > 1]
+	Fewest = {k: min(Final[k] for Final in Finals) for k in Varying}
+	Ties["Parties"] = [VList[k][0] for k in Varying]
+	Ties["Winners"] = [VList[k][0] for k in Varying if VList[k][2] > Fewest[k]]
+	Ties["Seats"] = sum(VList[k][2] - Fewest[k] for k in Varying)
+	Ties["Allocations"] = [{VList[k][0]: Final[k] for k in Varying} for Final in Finals]
+
+# Infinite averages are only tied with each other
+def QM_IsTied(a, b):
+	return a == b or (b < inf and IsTied(a, b, abs(b)))
+
+
+# Leveling seats
+# The smallest house has the critical average: the lowest average
+# that gives some party its last fixed seat. The house is then all the averages
+# above that, counted for each party with a galloping search,
+# and the seats at exactly that average that are needed for the fixed seats.
+
+def LevelingSeats(DivisorFunc, Votes, TotalSeats, *, Initial=0):
+	def Average(NumVotes, Seats):
+		Dvsr = DivisorFunc(Seats)
+		return NumVotes/float(Dvsr) if Dvsr > 0 else inf
+	
+	CritAvg = None
+	for Vote in Votes:
+		if Vote[2] > Initial:
+			if Vote[1] <= 0:
+				raise ValueError("Party with fixed seats and no votes: " + str(Vote[0]))
+			Avg = Average(Vote[1], Vote[2]-1)
+			if CritAvg == None or Avg < CritAvg: CritAvg = Avg
+	
+	def SeatsForAvg(NumVotes):
+		# Number of seats with averages above CritAvg:
+		# find an upper bound, then bisect
+		Lower = Initial
+		if Average(NumVotes, Lower) <= CritAvg: return Lower
+		Step = 1
+		while Average(NumVotes, Lower + Step) > CritAvg:
+			Lower += Step
+			Step *= 2
+		Upper = Lower + Step
+		while Upper - Lower > 1:
+			Mid = (Lower + Upper)//2
+			if Average(NumVotes, Mid) > CritAvg:
+				Lower = Mid
+			else:
+				Upper = Mid
+		return Upper
+	
+	if CritAvg != None:
+		VList = [[Vote[0], Vote[1], SeatsForAvg(Vote[1]), 0] for Vote in Votes]
+		# The seats at CritAvg go in list order, as in HighestAverages,
+		# up to the last party that needs one for its fixed seats
+		LastNeeded = max(k for k, Vote in enumerate(Votes) if VList[k][2] < Vote[2])
+		for Vote in VList[:LastNeeded+1]:
+			if Average(Vote[1], Vote[2]) == CritAvg:
+				Vote[2] += 1
+		HouseSize = sum(Vote[2] for Vote in VList)
+		if HouseSize >= TotalSeats:
+			return (HouseSize, sorted(VList, key=SortKeyFinal))
+	
+	return (TotalSeats, HighestAverages(DivisorFunc, AddInitial(Votes, Initial), TotalSeats))
+
+
 def DifferentInitial(DivisorFunc, InitialValue, k):
 	if k == 0:
 		return InitialValue
@@ -239,14 +813,21 @@ HA_Divisors["Imperiali"] = lambda k: k + 1.
 
 # Largest-remainder method
 
-def LargestRemainder(QuotaAdjust, Votes, TotalSeats, *, MinSeats=None, MaxSeats=None):
+def LargestRemainder(QuotaAdjust, Votes, TotalSeats, *, MinSeats=None, MaxSeats=None, \
+		Ties=None, Threshold=None):
 	IsMin = MinSeats != None
 	IsMax = MaxSeats != None
+	ClearTies(Ties)
+	if Threshold != None:
+		return AllocAboveThreshold(lambda Passed: LargestRemainder(QuotaAdjust, Passed, \
+			TotalSeats, MinSeats=MinSeats, MaxSeats=MaxSeats, Ties=Ties), Votes, Threshold)
 	
 	# VList members have party, votes, seats, direction, remainders
 	VList = [list(Vote[:2]) + [0, 0, 0] for Vote in Votes]
 	
 	RemainingSeats = 0
+	Quota = None
+	TopUps = []
 	
 	SortKey = lambda a: (-a[4],-a[1],a[0])
 	
@@ -290,6 +871,7 @@ def LargestRemainder(QuotaAdjust, Votes, TotalSeats, *, MinSeats=None, MaxSeats=
 				RemainingSeats -= Vote[2]
 		if RemainingSeats < 0: break
 		
+		TopUps = []
 		for Vote in VList:
 			if Vote[3] == 0:
 				if RemainingSeats == 0: break
@@ -301,12 +883,29 @@ def LargestRemainder(QuotaAdjust, Votes, TotalSeats, *, MinSeats=None, MaxSeats=
 				else:
 					Vote[2] += 1
 					RemainingSeats -= 1
+					TopUps.append(Vote)
 		
 		if not WentOutOfRange: break
 	
 	if RemainingSeats < 0:
 		return LargestRemainder(QuotaAdjust-1, Votes, TotalSeats, \
-			MinSeats=MinSeats, MaxSeats=MaxSeats)
+			MinSeats=MinSeats, MaxSeats=MaxSeats, Ties=Ties)
+	
+	# Ties: the parties whose remainders equal the last topped-up one's
+	if Ties != None and len(TopUps) > 0:
+		LastRem = TopUps[-1][4]
+		Winners = []
+		Losers = []
+		for Vote in VList:
+			if Vote[3] == 0 and IsTied(Vote[4], LastRem, Quota):
+				if any(Vote is TopUp for TopUp in TopUps):
+					Winners.append(Vote[0])
+				else:
+					Losers.append(Vote[0])
+		if len(Losers) > 0:
+			Ties["Parties"] = Winners + Losers
+			Ties["Winners"] = Winners
+			Ties["Seats"] = len(Winners)
 	
 	return [Vote[:4] for Vote in sorted(VList,key=SortKeyFinal)]
 
@@ -340,27 +939,14 @@ def CountSeatsForDvsr(VList, Dvsr, Rndf, MinSeats, MaxSeats):
 	
 	return AllocSeats
 
-def AdjustDivisor(RoundDir, Votes, TotalSeats, *, MinSeats=None, MaxSeats=None):
-	IsMin = MinSeats != None
-	IsMax = MaxSeats != None
-	
-	# Set the rounding function:
-	if RoundDir > 0:
-		rndf = ceil
-	elif RoundDir < 0:
-		rndf = floor
-	else:
-		rndf = round
-
-	# Members have party, votes, seats, direction
-	VList = [list(Vote[:2]) + [0, 0] for Vote in Votes]
-	
-	# Find the initial divisor
-	TotalVotes = 0
-	for Vote in VList:
-		TotalVotes += Vote[1]
+# Searches for a divisor that gives TotalSeats,
+# with CountFunc(Dvsr) returning the number of seats for a divisor.
+# Returns (divisor, lower bound, upper bound), with the bounds None
+# if the divisor gives TotalSeats. If not, no divisor does: the interval is too small.
+# The divisor is the last one counted.
+def AD_FindDivisor(CountFunc, TotalVotes, TotalSeats):
 	Dvsr = float(TotalVotes)/float(TotalSeats)
-	DvsrSeats = CountSeatsForDvsr(VList, Dvsr, rndf, MinSeats, MaxSeats)
+	DvsrSeats = CountFunc(Dvsr)
 	
 	# Find the divisor-value bracket:
 	# divisor and number of seats 1 and 2
@@ -371,10 +957,9 @@ def AdjustDivisor(RoundDir, Votes, TotalSeats, *, MinSeats=None, MaxSeats=None):
 		DvsrSeats1 = DvsrSeats
 		while True:
 			Dvsr *= 2
-			DvsrSeats = CountSeatsForDvsr(VList, Dvsr, rndf, MinSeats, MaxSeats)
+			DvsrSeats = CountFunc(Dvsr)
 			if DvsrSeats == TotalSeats:
-				VList.sort(key=SortKeyFinal)
-				return VList
+				return (Dvsr, None, None)
 			elif DvsrSeats < TotalSeats:
 				Dvsr2 = Dvsr
 				DvsrSeats2 = DvsrSeats
@@ -384,28 +969,25 @@ def AdjustDivisor(RoundDir, Votes, TotalSeats, *, MinSeats=None, MaxSeats=None):
 		DvsrSeats2 = DvsrSeats
 		while True:
 			Dvsr /= 2
-			DvsrSeats = CountSeatsForDvsr(VList, Dvsr, rndf, MinSeats, MaxSeats)
+			DvsrSeats = CountFunc(Dvsr)
 			if DvsrSeats == TotalSeats:
-				VList.sort(key=SortKeyFinal)
-				return VList
+				return (Dvsr, None, None)
 			elif DvsrSeats > TotalSeats:
 				Dvsr1 = Dvsr
 				DvsrSeats1 = DvsrSeats
 				break
 	else:
-		VList.sort(key=SortKeyFinal)
-		return VList
+		return (Dvsr, None, None)
 	
 	# Find the next value with linear interpolation
 	while True:
 		Dvsr = Dvsr1 + (Dvsr2 - Dvsr1) * \
 			( float(TotalSeats - DvsrSeats1) / float(DvsrSeats2 - DvsrSeats1) )
-		DvsrSeats = CountSeatsForDvsr(VList, Dvsr, rndf, MinSeats, MaxSeats)
+		DvsrSeats = CountFunc(Dvsr)
 		
 		# Interval too small?
 		if abs(Dvsr2 - Dvsr1)/(Dvsr1 + Dvsr2) < 1e-8:
-			VList.sort(key=SortKeyFinal)
-			return VList
+			return (Dvsr, Dvsr1, Dvsr2)
 		
 		if DvsrSeats > TotalSeats:
 			# Dvsr too small
@@ -418,8 +1000,52 @@ def AdjustDivisor(RoundDir, Votes, TotalSeats, *, MinSeats=None, MaxSeats=None):
 			Dvsr2 = Dvsr
 			DvsrSeats = DvsrSeats
 		else:
-			VList.sort(key=SortKeyFinal)
-			return VList
+			return (Dvsr, None, None)
+
+def AdjustDivisor(RoundDir, Votes, TotalSeats, *, MinSeats=None, MaxSeats=None, \
+		Ties=None, Threshold=None):
+	IsMin = MinSeats != None
+	IsMax = MaxSeats != None
+	ClearTies(Ties)
+	if Threshold != None:
+		return AllocAboveThreshold(lambda Passed: AdjustDivisor(RoundDir, Passed, \
+			TotalSeats, MinSeats=MinSeats, MaxSeats=MaxSeats, Ties=Ties), Votes, Threshold)
+	
+	# Set the rounding function:
+	if RoundDir > 0:
+		rndf = ceil
+	elif RoundDir < 0:
+		rndf = floor
+	else:
+		rndf = round
+
+	# Members have party, votes, seats, direction
+	VList = [list(Vote[:2]) + [0, 0] for Vote in Votes]
+	
+	# Find the divisor
+	TotalVotes = 0
+	for Vote in VList:
+		TotalVotes += Vote[1]
+	Dvsr, Dvsr1, Dvsr2 = AD_FindDivisor( \
+		lambda Dvsr: CountSeatsForDvsr(VList, Dvsr, rndf, MinSeats, MaxSeats), \
+		TotalVotes, TotalSeats)
+	
+	# No divisor gives the right number: a tie between the parties
+	# whose numbers of seats differ across the interval
+	if Dvsr1 != None and Ties != None:
+		VList1 = [list(Vote) for Vote in VList]
+		CountSeatsForDvsr(VList1, Dvsr1, rndf, MinSeats, MaxSeats)
+		VList2 = [list(Vote) for Vote in VList]
+		BaseSeats = CountSeatsForDvsr(VList2, Dvsr2, rndf, MinSeats, MaxSeats)
+		for Vote, Vote1, Vote2 in zip(VList, VList1, VList2):
+			if Vote1[2] != Vote2[2]:
+				Ties["Parties"].append(Vote[0])
+				if Vote[2] == Vote1[2]:
+					Ties["Winners"].append(Vote[0])
+		Ties["Seats"] = TotalSeats - BaseSeats
+	
+	VList.sort(key=SortKeyFinal)
+	return VList
 
 def AdjustedDivisor(*args, **kwargs):
 	return AdjustDivisor(*args, **kwargs)
@@ -427,72 +1053,581 @@ def AdjustedDivisor(*args, **kwargs):
 AD_Rounding = {"Jefferson": -1, "Webster": 0, "Adams": 1}
 
 
-# Examples
-Examples = {}
+# Optimal apportionment
+# Each party's seats start at the bottom of its own cost, within MinSeats and MaxSeats.
+# Seats are then added (or removed) one at a time, the cheapest first,
+# from a heap of the parties' next costs. With costs convex in the seats,
+# every party's moves run along its rising costs, so the cheapest moves
+# give the smallest total (or largest) cost.
+# For the deviation objectives, the bottoms are next to the quotas,
+# so only a few seats are moved, however many there are.
 
-ExampleTargets = {}
+def OA_Ratio(a, b):
+	if b > 0: return a/b
+	return 0. if a == 0 else inf
 
-# From Wikipedia's Highest-Averages article
+# The first number of seats from Lowest to Highest that is at the bottom,
+# or Highest if none is: a galloping search from Seats, then bisection
+def OA_FirstAtBottom(AtBottom, Seats, Lowest, Highest):
+	Step = 1
+	if AtBottom(Seats):
+		Upper = Seats
+		Lower = Seats - 1
+		while Lower >= Lowest and AtBottom(Lower):
+			Upper = Lower
+			Step *= 2
+			Lower = Upper - Step
+		Lower = max(Lower, Lowest - 1)
+	else:
+		Lower = Seats
+		Upper = Seats + 1
+		while (Highest == None or Upper < Highest) and not AtBottom(Upper):
+			Lower = Upper
+			Step *= 2
+			Upper = Lower + Step
+		if Highest != None: Upper = min(Upper, Highest)
+	
+	while Upper - Lower > 1:
+		Mid = (Lower + Upper)//2
+		if AtBottom(Mid):
+			Upper = Mid
+		else:
+			Lower = Mid
+	return Upper
 
-# Original: Jefferson, Webster
-Examples["WikiHA11"] = (("Yellow", 46_000), ("White", 25_000), ("Red", 12_210), \
-	("Green", 8_350), ("Purple", 8_340))
+def OptimalApportionment(Objective, Votes, TotalSeats, *, MinSeats=None, MaxSeats=None, \
+		Ties=None, Threshold=None):
+	IsMin = MinSeats != None
+	IsMax = MaxSeats != None
+	ClearTies(Ties)
+	if Threshold != None:
+		return AllocAboveThreshold(lambda Passed: OptimalApportionment(Objective, Passed, \
+			TotalSeats, MinSeats=MinSeats, MaxSeats=MaxSeats, Ties=Ties), Votes, Threshold)
+	
+	Aggregate, CostFunc = Objective
+	Lowest = MinSeats if IsMin else 0
+	TotalVotes = sum(Vote[1] for Vote in Votes)
+	Scale = TotalSeats/float(TotalVotes) if TotalVotes > 0 else 0.
+	
+	# The cost of each party's seat number Seats (counting from 1):
+	# for a sum, the change in cost from the seat before
+	if Aggregate == "Sum":
+		SeatCost = lambda Vote, Seats: CostFunc(Vote[1], Seats-1, Scale)
+	elif Aggregate == "Max":
+		SeatCost = lambda Vote, Seats: CostFunc(Vote[1], Seats, Scale)
+	else:
+		raise ValueError("Unknown objective aggregate: " + str(Aggregate))
+	
+	# VList members have party, votes, seats, direction
+	VList = []
+	for Vote in Votes:
+		NewVote = [Vote[0], Vote[1], 0, 0]
+		if Aggregate == "Sum":
+			AtBottom = lambda Seats: SeatCost(NewVote, Seats+1) >= 0
+		else:
+			AtBottom = lambda Seats: SeatCost(NewVote, Seats+1) >= SeatCost(NewVote, Seats)
+		Seats = max(int(Vote[1]*Scale), Lowest)
+		if IsMax: Seats = min(Seats, MaxSeats)
+		NewVote[2] = OA_FirstAtBottom(AtBottom, Seats, Lowest, MaxSeats)
+		VList.append(NewVote)
+	HouseSize = sum(Vote[2] for Vote in VList)
+	StartSeats = [Vote[2] for Vote in VList]
+	
+	# Heap of the costs of the parties' next moves; ties go to the earliest party,
+	# and in removing, from the latest one
+	if HouseSize < TotalSeats:
+		Change = 1
+		MoveCost = lambda Vote: SeatCost(Vote, Vote[2]+1)
+		CanMove = lambda Vote: not IsMax or Vote[2] < MaxSeats
+		Order = 1
+	else:
+		Change = -1
+		if Aggregate == "Sum":
+			MoveCost = lambda Vote: -SeatCost(Vote, Vote[2])
+		else:
+			MoveCost = lambda Vote: SeatCost(Vote, Vote[2]-1)
+		CanMove = lambda Vote: Vote[2] > Lowest
+		Order = -1
+	
+	CostHeap = [(MoveCost(Vote), Order*k) for k, Vote in enumerate(VList) if CanMove(Vote)]
+	heapify(CostHeap)
+	LastCost = None
+	while HouseSize != TotalSeats and len(CostHeap) > 0:
+		Entry = heappop(CostHeap)
+		LastCost = Entry[0]
+		Vote = VList[Order*Entry[1]]
+		Vote[2] += Change
+		HouseSize += Change
+		if CanMove(Vote):
+			heappush(CostHeap, (MoveCost(Vote), Entry[1]))
+	
+	# Forced to the maximum if the next seat would have come before
+	# the costliest seat above the minimum, or if there are seats left over;
+	# forced to the minimum if the quota is below it
+	Given = [(SeatCost(Vote, Vote[2]), k) for k, Vote in enumerate(VList) if Vote[2] > Lowest]
+	if len(Given) > 0:
+		Costliest = max(Given)
+		for k, Vote in enumerate(VList):
+			if IsMax and Vote[2] >= MaxSeats and (HouseSize < TotalSeats or \
+					(SeatCost(Vote, Vote[2]+1), k) < Costliest):
+				Vote[3] = 1
+	if IsMin:
+		for Vote in VList:
+			if Vote[2] == MinSeats and Vote[1]*Scale < MinSeats:
+				Vote[3] = -1
+	
+	# Ties: the parties that the last move could have gone to, with the same cost.
+	# In adding, the winners got their last seat in a move with that cost;
+	# in removing, the winners kept a seat that could have been taken with that cost,
+	# and the others lost a seat with it.
+	if Ties != None and LastCost != None:
+		TieScale = abs(LastCost)
+		Winners = []
+		Losers = []
+		for Vote, Start in zip(VList, StartSeats):
+			if Change > 0:
+				if Vote[2] > Start and IsTied(SeatCost(Vote, Vote[2]), LastCost, TieScale):
+					Winners.append(Vote[0])
+				elif CanMove(Vote) and IsTied(MoveCost(Vote), LastCost, TieScale):
+					Losers.append(Vote[0])
+			else:
+				if Vote[2] < Start and \
+						IsTied(MoveCost([Vote[0], Vote[1], Vote[2]+1]), LastCost, TieScale):
+					Losers.append(Vote[0])
+				elif CanMove(Vote) and IsTied(MoveCost(Vote), LastCost, TieScale):
+					Winners.append(Vote[0])
+		if len(Winners) > 0 and len(Losers) > 0:
+			Ties["Parties"] = Winners + Losers
+			Ties["Winners"] = Winners
+			Ties["Seats"] = len(Winners)
+	
+	return sorted(VList, key=SortKeyFinal)
 
-ExampleTargets["WikiHA11"] = (21, {"HA-DHondt": (11,6,2,1,1), \
-	"HA-SainteLague": (9,5,3,2,2) } )
+# A divisor method as an objective: the cost of each seat is its divisor over the votes,
+# less one over the standard divisor, so that the bottom is near the quota
+def DivisorObjective(DivisorFunc):
+	return ("Sum", lambda NumVotes, Seats, Scale: \
+		DivisorFunc(Seats)/float(NumVotes) - Scale if NumVotes > 0 else inf)
 
-# Original: Adams, Webster
-Examples["WikiHA12"] = (("Yellow", 55_000), ("White", 17_290), ("Red", 16_600), \
-	("Green", 5_560), ("Purple", 5_550))
+OA_Objectives = {}
 
-ExampleTargets["WikiHA12"] = (21, {"HA-Adams": (10,4,3,2,2), \
-	"HA-SainteLague": (11,4,4,1,1) } )
+OA_Objectives["LoosemoreHanby"] = ("Sum", lambda NumVotes, Seats, Scale: \
+	abs(Seats + 1 - NumVotes*Scale) - abs(Seats - NumVotes*Scale))
 
-# Original: Jefferson, Webster, Huntington-Hill, Adams
-Examples["WikiHA13"] = (("Yellow", 47_000), ("White", 16_000), ("Red", 15_900), \
-	("Green", 12_000), ("Blue", 6,000), ("Pink", 3_100))
+OA_Objectives["Gallagher"] = ("Sum", lambda NumVotes, Seats, Scale: \
+	2*(Seats - NumVotes*Scale) + 1)
 
-ExampleTargets["WikiHA13"] = (10, {"HA-DHondt": (5,2,2,1,0,0), \
-	"HA-SainteLague": (4,2,2,1,1,0), "HA-HuntingtonHill": (4,2,1,1,1,1), \
-	"HA-Adams": (3,2,2,1,1,1) } )
+OA_Objectives["SainteLague"] = ("Sum", lambda NumVotes, Seats, Scale: \
+	OA_Ratio(2*(Seats - NumVotes*Scale) + 1, NumVotes*Scale))
 
-# From Wikipedia's D'Hondt and Sainte-Lague articles
-Examples["WikiHA2"] = (('A',100_000), ('B',80_000), ('C',30_000), ('D',20_000))
+OA_Objectives["RelSquared"] = ("Sum", lambda NumVotes, Seats, Scale: \
+	OA_Ratio(2*(Seats - NumVotes*Scale) + 1, (NumVotes*Scale)**2))
 
-ExampleTargets["WikiHA2"] = (8, \
-	{"HA-DHondt": (4,3,1,0), "HA-SainteLague": (3,3,1,1) } )
+OA_Objectives["DHondt"] = ("Max", lambda NumVotes, Seats, Scale: \
+	OA_Ratio(Seats, NumVotes*Scale))
 
-# From Wikipedia's Huntington-Hill article
-Examples["WikiHA3"] = (('A',100_000), ('B',80_000), ('C',30_000))
+OA_Objectives["MaxDeviation"] = ("Max", lambda NumVotes, Seats, Scale: \
+	abs(Seats - NumVotes*Scale))
 
-ExampleTargets["WikiHA3"] = (8, {"HA-HuntingtonHill": (4,3,1) } )
+OA_Objectives["MaxRelative"] = ("Max", lambda NumVotes, Seats, Scale: \
+	abs(OA_Ratio(Seats - NumVotes*Scale, NumVotes*Scale)))
 
-# Israel's Knesset, 2015 election of 20th one
-Examples["WikiHAKn"] = (("Likud",985_408), ("Zionist Union",786_313), \
-	("Joint List",446_583), ("Yesh Atid",371_602), ("Kulanu",315_360), \
-	("The Jewish Home",283_910), ("Shas",241_613), ("Yisrael Beiteinu",214_906), \
-	("United Torah Judaism",210_143), ("Meretz",165_529))
 
-ExampleTargets["WikiHAKn"] = (120, {"HA-HuntingtonHill": (30,24,13,11,9,9,7,6,6,5), \
-	"HA-DHondt": (30,24,13,11,10,8,7,6,6,5) } )
+# Allocation by method name
 
-# From Wikipedia's largest-remainders article
-Examples["WikiLR1"] = (("Yellow",47_000), ("White",16_000), ("Red",15_800), \
-		("Green",12_000), ("Blue",6_100), ("Pink",3_100))
+def AllocByName(MethodName, Votes, TotalSeats, *, MinSeats=None, MaxSeats=None, Ties=None, \
+		Threshold=None):
+	Family, Name = MethodName.split("-", 1)
+	if Family == "HA":
+		Initial = MinSeats if MinSeats != None else 0
+		return HighestAverages(HA_Divisors[Name], AddInitial(Votes, Initial), TotalSeats, \
+			MaxSeats=MaxSeats, Ties=Ties, Threshold=Threshold)
+	elif Family == "LR":
+		return LargestRemainder(LR_QuotaAdjust[Name], Votes, TotalSeats, \
+			MinSeats=MinSeats, MaxSeats=MaxSeats, Ties=Ties, Threshold=Threshold)
+	elif Family == "AD":
+		return AdjustDivisor(AD_Rounding[Name], Votes, TotalSeats, \
+			MinSeats=MinSeats, MaxSeats=MaxSeats, Ties=Ties, Threshold=Threshold)
+	elif Family == "QM":
+		return QuotaMethod(HA_Divisors[Name], Votes, TotalSeats, \
+			MinSeats=MinSeats, MaxSeats=MaxSeats, Ties=Ties, Threshold=Threshold)
+	elif Family == "OA":
+		return OptimalApportionment(OA_Objectives[Name], Votes, TotalSeats, \
+			MinSeats=MinSeats, MaxSeats=MaxSeats, Ties=Ties, Threshold=Threshold)
+	raise ValueError("Unknown method family: " + MethodName)
 
-ExampleTargets["WikiLR1"] = (10, {"LR-Droop": (5, 2, 2, 1, 0, 0) } )
 
-Examples["WikiLR2"] = (('A',1500), ('B',1500), ('C',900), ('D',500), \
-	('E',500), ('F',200))
+# Sweep of the electoral threshold
 
-ExampleTargets["WikiLR21"] = (25, {"LR-Hare": (7,7,4,3,3,1) } )
+def ThresholdSweep(MethodName, Votes, TotalSeats, ThreshMin, ThreshMax, *, \
+		MinSeats=None, MaxSeats=None):
+	Family, Name = MethodName.split("-", 1)
+	TotalVotes = sum(Vote[1] for Vote in Votes)
+	
+	# Parties from most to fewest votes, and the groups of them with equal votes,
+	# which are dropped together
+	Ordered = sorted(Votes, key=lambda Vote: -Vote[1])
+	Groups = []
+	for k, Vote in enumerate(Ordered):
+		if k == 0 or Vote[1] != Ordered[k-1][1]:
+			Groups.append(k)
+	
+	# Start with the parties that pass ThreshMin
+	NumPassed = len(Ordered)
+	while NumPassed > 0 and Ordered[NumPassed-1][1] < ThreshMin*TotalVotes:
+		NumPassed -= 1
+	
+	Sweep = []
+	ThreshLo = ThreshMin
+	PrevSeats = None
+	while True:
+		Passed = Ordered[:NumPassed]
+		Failed = [[Vote[0], Vote[1], 0, -1] for Vote in Ordered[NumPassed:]]
+		if NumPassed == 0:
+			Res = []
+		elif Family == "HA" and PrevSeats != None:
+			Initial = MinSeats if MinSeats != None else 0
+			Res = HighestAveragesFrom(HA_Divisors[Name], AddInitial(Passed, Initial), \
+				TotalSeats, PrevSeats, MaxSeats=MaxSeats)
+		else:
+			Res = AllocByName(MethodName, Passed, TotalSeats, \
+				MinSeats=MinSeats, MaxSeats=MaxSeats)
+		Res = sorted(Res + Failed, key=SortKeyFinal)
+		Seats = {r[0]: r[2] for r in Res}
+		
+		# The smallest party passing sets the top of this threshold interval
+		ThreshHi = Ordered[NumPassed-1][1]/float(TotalVotes) if NumPassed > 0 else ThreshMax
+		ThreshHi = min(ThreshHi, ThreshMax)
+		if Seats == PrevSeats:
+			Sweep[-1][1] = ThreshHi
+		else:
+			Sweep.append([ThreshLo, ThreshHi, Res])
+		PrevSeats = Seats
+		if ThreshHi >= ThreshMax or NumPassed == 0: break
+		
+		# Drop the group with the fewest votes
+		ThreshLo = ThreshHi
+		while Groups[-1] >= NumPassed: Groups.pop()
+		NumPassed = Groups.pop()
+	
+	return Sweep
+
+
+# Allocations under ties
+# Only the tied parties' seats are varied
 
-ExampleTargets["WikiLR22"] = (26, {"LR-Hare": (8,8,5,2,2,1) } )
+def CountTiedAllocations(Ties):
+	if "Allocations" in Ties: return len(Ties["Allocations"])
+	return comb(len(Ties["Parties"]), Ties["Seats"])
+
+def TiedAllocations(Res, Ties):
+	if "Allocations" in Ties:
+		for Seats in Ties["Allocations"]:
+			Alloc = [list(r) for r in Res]
+			for r in Alloc:
+				if r[0] in Seats: r[2] = Seats[r[0]]
+			yield sorted(Alloc, key=SortKeyFinal)
+		return
+	
+	BaseSeats = {}
+	for r in Res:
+		BaseSeats[r[0]] = r[2]
+	for Party in Ties["Winners"]:
+		BaseSeats[Party] -= 1
+	
+	for Chosen in combinations(Ties["Parties"], Ties["Seats"]):
+		Alloc = [list(r) for r in Res]
+		for r in Alloc:
+			r[2] = BaseSeats[r[0]] + (1 if r[0] in Chosen else 0)
+		yield sorted(Alloc, key=SortKeyFinal)
+
+
+# Disproportionality metrics
+# The vote shares are found only once for a whole batch of seat lists
+
+MetricNames = ("Gallagher", "LoosemoreHanby", "SainteLague", "DHondt", \
+	"ENPVotes", "ENPSeats")
+
+def BatchMetrics(VoteCounts, SeatMatrix):
+	TotalVotes = float(sum(VoteCounts))
+	VoteShares = [Votes/TotalVotes for Votes in VoteCounts]
+	InvShares = [1./Share if Share > 0 else 0. for Share in VoteShares]
+	VoteSqSum = sum(Share*Share for Share in VoteShares)
+	ENPVotes = 1./VoteSqSum if VoteSqSum > 0 else 0.
+	
+	MetricList = []
+	for Seats in SeatMatrix:
+		TotalSeats = sum(Seats)
+		SeatScale = 1./TotalSeats if TotalSeats > 0 else 0.
+		DiffSqSum = 0.
+		DiffAbsSum = 0.
+		SLSum = 0.
+		SeatSqSum = 0.
+		MaxRatio = 0.
+		for VoteShare, InvShare, NumSeats in zip(VoteShares, InvShares, Seats):
+			SeatShare = NumSeats*SeatScale
+			Diff = SeatShare - VoteShare
+			DiffSq = Diff*Diff
+			DiffSqSum += DiffSq
+			DiffAbsSum += abs(Diff)
+			SLSum += DiffSq*InvShare
+			SeatSqSum += SeatShare*SeatShare
+			Ratio = SeatShare*InvShare
+			if Ratio > MaxRatio: MaxRatio = Ratio
+		MetricList.append({"Gallagher": sqrt(0.5*DiffSqSum), \
+			"LoosemoreHanby": 0.5*DiffAbsSum, "SainteLague": SLSum, \
+			"DHondt": MaxRatio, "ENPVotes": ENPVotes, \
+			"ENPSeats": 1./SeatSqSum if SeatSqSum > 0 else 0.})
+	
+	return MetricList
+
+def AllocMetrics(Res):
+	return BatchMetrics([r[1] for r in Res], [[r[2] for r in Res]])[0]
+
+
+# Seats-votes curves
+
+def HA_SeatsVotesCurve(DivisorFunc, Votes, Party, VoteMin, VoteMax, TotalSeats, *, \
+		MaxSeats=None):
+	IsMax = MaxSeats != None
+	
+	def Average(NumVotes, Seats):
+		Dvsr = DivisorFunc(Seats)
+		return NumVotes/float(Dvsr) if Dvsr > 0 else inf
+	
+	# The other parties' next averages, as negatives for finding the largest
+	AvgHeap = []
+	PartySeats = 0
+	RemainingSeats = TotalSeats
+	for Vote in Votes:
+		Seats = Vote[2]
+		if IsMax and Seats > MaxSeats: Seats = MaxSeats
+		if Vote[0] == Party:
+			PartySeats = Seats
+		elif not IsMax or Seats < MaxSeats:
+			AvgHeap.append((-Average(Vote[1],Seats), Vote[1], Seats))
+		RemainingSeats -= Seats
+	heapify(AvgHeap)
+	
+	# The other parties' largest averages, one for each available seat
+	OtherAvgs = []
+	while len(OtherAvgs) < RemainingSeats and len(AvgHeap) > 0:
+		NegAvg, NumVotes, Seats = heappop(AvgHeap)
+		OtherAvgs.append(-NegAvg)
+		Seats += 1
+		if not IsMax or Seats < MaxSeats:
+			heappush(AvgHeap, (-Average(NumVotes,Seats), NumVotes, Seats))
+	
+	# The party's k-th extra seat needs its k-th average to reach
+	# the other parties' (RemainingSeats - k + 1)-th average
+	MaxExtra = RemainingSeats
+	if IsMax: MaxExtra = min(MaxExtra, MaxSeats - PartySeats)
+	Thresholds = []
+	for k in range(1, MaxExtra+1):
+		m = RemainingSeats - k
+		OtherAvg = OtherAvgs[m] if m < len(OtherAvgs) else 0.
+		Dvsr = DivisorFunc(PartySeats + k - 1)
+		Thresholds.append(OtherAvg*Dvsr if Dvsr > 0 else 0.)
+	
+	Seats = PartySeats
+	for Thres in Thresholds:
+		if Thres <= VoteMin: Seats += 1
+	Curve = [(VoteMin, Seats)]
+	for Thres in Thresholds:
+		if VoteMin < Thres <= VoteMax:
+			Seats += 1
+			if Thres == Curve[-1][0]:
+				Curve[-1] = (Thres, Seats)
+			else:
+				Curve.append((Thres, Seats))
+	
+	return Curve
+
+
+# For a largest-remainder system with the party's quota x*SeatsAdj/(x + sum of OtherVotes):
+# where the quotas cross whole numbers for party votes x between x1 and x2,
+# and where the party's remainder passes another party's remainder
+def LR_QuotaSteps(OtherVotes, SeatsAdj, x1, x2):
+	VoteSum = sum(OtherVotes)
+	if VoteSum <= 0: return set()
+	
+	def QuotaScale(x): return SeatsAdj/float(x + VoteSum)
+	
+	Points = set()
+	for m in range(ceil(x1*QuotaScale(x1)), floor(x2*QuotaScale(x2))+1):
+		if 0 < m < SeatsAdj: Points.add(m*VoteSum/float(SeatsAdj - m))
+	for NumVotes in OtherVotes:
+		for m in range(max(ceil(NumVotes*QuotaScale(x2)),1), \
+				floor(NumVotes*QuotaScale(x1))+1):
+			Points.add(NumVotes*SeatsAdj/float(m) - VoteSum)
+	Bounds = [x1] + sorted(x for x in Points if x1 < x < x2) + [x2]
+	
+	# Between those, the rounded-down quotas are fixed
+	for xl, xu in zip(Bounds[:-1], Bounds[1:]):
+		Scale = QuotaScale(0.5*(xl + xu))
+		PartyFloor = floor(0.5*(xl + xu)*Scale)
+		for NumVotes in OtherVotes:
+			FloorDiff = PartyFloor - floor(NumVotes*Scale)
+			if SeatsAdj != FloorDiff:
+				x = (NumVotes*SeatsAdj + FloorDiff*VoteSum)/float(SeatsAdj - FloorDiff)
+				if xl < x < xu: Points.add(x)
+	
+	return set(x for x in Points if x1 < x < x2)
+
+def LR_SeatsVotesCurve(QuotaAdjust, Votes, Party, VoteMin, VoteMax, TotalSeats, *, \
+		MinSeats=None, MaxSeats=None):
+	IsBounded = MinSeats != None or MaxSeats != None
+	
+	def AllocForVotes(NumVotes):
+		TrialVotes = [(Vote[0], NumVotes if Vote[0] == Party else Vote[1]) for Vote in Votes]
+		if Party not in (Vote[0] for Vote in Votes):
+			TrialVotes.append((Party, NumVotes))
+		return LargestRemainder(QuotaAdjust, TrialVotes, TotalSeats, \
+			MinSeats=MinSeats, MaxSeats=MaxSeats)
+	
+	def SeatsForVotes(NumVotes):
+		for r in AllocForVotes(NumVotes):
+			if r[0] == Party: return r[2]
+	
+	# Where a quota gives too many seats, LargestRemainder tries again
+	# with the next smaller quota adjustment, so the steps for all of them are used
+	def QuotaSteps(OtherVotes, SeatSum, x1, x2):
+		Points = set()
+		for Adjust in range(QuotaAdjust, min(QuotaAdjust,0)-1, -1):
+			Points |= LR_QuotaSteps(OtherVotes, SeatSum + Adjust, x1, x2)
+		return Points
+	
+	OtherVotes = [Vote[1] for Vote in Votes if Vote[0] != Party]
+	Points = QuotaSteps(OtherVotes, TotalSeats, VoteMin, VoteMax)
+	
+	# With a minimum or maximum, also use the steps of the parties left unforced,
+	# until no more are found
+	Checked = set()
+	for Pass in range(IsBounded*(len(Votes) + 1)):
+		Bounds = [VoteMin] + sorted(Points) + [VoteMax]
+		NewPoints = set()
+		for x1, x2 in zip(Bounds[:-1], Bounds[1:]):
+			if (x1, x2) in Checked: continue
+			Checked.add((x1, x2))
+			UnforcedVotes = []
+			SeatSum = TotalSeats
+			IsPartyForced = False
+			for r in AllocForVotes(0.5*(x1 + x2)):
+				if r[3] != 0:
+					SeatSum -= r[2]
+					if r[0] == Party: IsPartyForced = True
+				elif r[0] != Party:
+					UnforcedVotes.append(r[1])
+			if IsPartyForced: continue
+			NewPoints |= QuotaSteps(UnforcedVotes, SeatSum, x1, x2)
+		NewPoints -= Points
+		if len(NewPoints) == 0: break
+		Points |= NewPoints
+	Bounds = [VoteMin] + sorted(Points) + [VoteMax]
+	
+	Curve = []
+	PrevMid = None
+	for x1, x2 in zip(Bounds[:-1], Bounds[1:]):
+		Mid = 0.5*(x1 + x2)
+		Seats = SeatsForVotes(Mid)
+		if len(Curve) == 0:
+			Curve.append((VoteMin, Seats))
+		elif Seats != Curve[-1][1]:
+			Step = x1
+			if IsBounded:
+				# The forcing may move the step: find it by bisection
+				Lower = PrevMid
+				Upper = Mid
+				while (Upper - Lower) > 1e-12*(Upper + Lower):
+					Trial = 0.5*(Lower + Upper)
+					if SeatsForVotes(Trial) == Seats:
+						Upper = Trial
+					else:
+						Lower = Trial
+				Step = Upper
+			Curve.append((Step, Seats))
+		PrevMid = Mid
+	
+	return Curve
+
+
+# Examples, made when first used: PropAlloc.Examples and PropAlloc.ExampleTargets
+def MakeExamples():
+	Examples = {}
+	
+	ExampleTargets = {}
+	
+	# From Wikipedia's Highest-Averages article
+	
+	# Original: Jefferson, Webster
+	Examples["WikiHA11"] = (("Yellow", 46_000), ("White", 25_000), ("Red", 12_210), \
+		("Green", 8_350), ("Purple", 8_340))
+	
+	ExampleTargets["WikiHA11"] = (21, {"HA-DHondt": (11,6,2,1,1), \
+		"HA-SainteLague": (9,5,3,2,2) } )
+	
+	# Original: Adams, Webster
+	Examples["WikiHA12"] = (("Yellow", 55_000), ("White", 17_290), ("Red", 16_600), \
+		("Green", 5_560), ("Purple", 5_550))
+	
+	ExampleTargets["WikiHA12"] = (21, {"HA-Adams": (10,4,3,2,2), \
+		"HA-SainteLague": (11,4,4,1,1) } )
+	
+	# Original: Jefferson, Webster, Huntington-Hill, Adams
+	Examples["WikiHA13"] = (("Yellow", 47_000), ("White", 16_000), ("Red", 15_900), \
+		("Green", 12_000), ("Blue", 6,000), ("Pink", 3_100))
+	
+	ExampleTargets["WikiHA13"] = (10, {"HA-DHondt": (5,2,2,1,0,0), \
+		"HA-SainteLague": (4,2,2,1,1,0), "HA-HuntingtonHill": (4,2,1,1,1,1), \
+		"HA-Adams": (3,2,2,1,1,1) } )
+	
+	# From Wikipedia's D'Hondt and Sainte-Lague articles
+	Examples["WikiHA2"] = (('A',100_000), ('B',80_000), ('C',30_000), ('D',20_000))
+	
+	ExampleTargets["WikiHA2"] = (8, \
+		{"HA-DHondt": (4,3,1,0), "HA-SainteLague": (3,3,1,1) } )
+	
+	# From Wikipedia's Huntington-Hill article
+	Examples["WikiHA3"] = (('A',100_000), ('B',80_000), ('C',30_000))
+	
+	ExampleTargets["WikiHA3"] = (8, {"HA-HuntingtonHill": (4,3,1) } )
+	
+	# Israel's Knesset, 2015 election of 20th one
+	Examples["WikiHAKn"] = (("Likud",985_408), ("Zionist Union",786_313), \
+		("Joint List",446_583), ("Yesh Atid",371_602), ("Kulanu",315_360), \
+		("The Jewish Home",283_910), ("Shas",241_613), ("Yisrael Beiteinu",214_906), \
+		("United Torah Judaism",210_143), ("Meretz",165_529))
+	
+	ExampleTargets["WikiHAKn"] = (120, {"HA-HuntingtonHill": (30,24,13,11,9,9,7,6,6,5), \
+		"HA-DHondt": (30,24,13,11,10,8,7,6,6,5) } )
+	
+	# From Wikipedia's largest-remainders article
+	Examples["WikiLR1"] = (("Yellow",47_000), ("White",16_000), ("Red",15_800), \
+			("Green",12_000), ("Blue",6_100), ("Pink",3_100))
+	
+	ExampleTargets["WikiLR1"] = (10, {"LR-Droop": (5, 2, 2, 1, 0, 0) } )
+	
+	Examples["WikiLR2"] = (('A',1500), ('B',1500), ('C',900), ('D',500), \
+		('E',500), ('F',200))
+	
+	ExampleTargets["WikiLR21"] = (25, {"LR-Hare": (7,7,4,3,3,1) } )
+	
+	ExampleTargets["WikiLR22"] = (26, {"LR-Hare": (8,8,5,2,2,1) } )
+	
+	return (Examples, ExampleTargets)
+
+def __getattr__(Name):
+	if Name in ("Examples", "ExampleTargets"):
+		globals()["Examples"], globals()["ExampleTargets"] = MakeExamples()
+		return globals()[Name]
+	raise AttributeError("module 'PropAlloc' has no attribute " + repr(Name))
 
 
 # For debugging
 if __name__ == "__main__":
 	
+	Examples, ExampleTargets = MakeExamples()
+	
 	def HADH(vts,num):
 		return HighestAverages(HA_Divisors["DHondt"], AddInitial(vts), num)
 	
@@ -597,4 +1732,28 @@ if __name__ == "__main__":
 	dumpout(AdjustedDivisor(1, TestSet, 100, MinSeats=15))
 	dumpout(AdjustedDivisor(-1, TestSet, 100, MinSeats=15, MaxSeats=30))
 	dumpout(AdjustedDivisor(0, TestSet, 100, MinSeats=15, MaxSeats=30))
-	dumpout(AdjustedDivisor(1, TestSet, 100, MinSeats=15, MaxSeats=30))
\ No newline at end of file
+	dumpout(AdjustedDivisor(1, TestSet, 100, MinSeats=15, MaxSeats=30))
+	
+	print("Seats-Votes Curves")
+	# With the Imperiali quota, some votes give too many seats,
+	# and the Droop quota is used there
+	CurveVotes = [("P0",0), ("P1",430), ("P2",744)]
+	for qtadj in (LR_QuotaAdjust["Hare"], LR_QuotaAdjust["Droop"], LR_QuotaAdjust["Imperiali"]):
+		Curve = LR_SeatsVotesCurve(qtadj, CurveVotes, "P0", 0, 3000, 7)
+		print(Curve)
+		for (x1, Seats), (x2, NextSeats) in zip(Curve, Curve[1:] + [(3000, None)]):
+			x = 0.5*(x1 + x2)
+			res = LargestRemainder(qtadj, [("P0",x)] + CurveVotes[1:], 7)
+			if [r[2] for r in res if r[0] == "P0"][0] != Seats:
+				print("Mismatch:", qtadj, x, Seats)
+	print(LargestRemainder(LR_QuotaAdjust["Imperiali"], [("P0",1724)] + CurveVotes[1:], 7))
+	
+	print("Leveling Seats")
+	# P3's last fixed seat and P5's sixth seat both have the critical average, 111/6 = 37/2,
+	# and only P3 needs its seat
+	LevelVotes = [("P0",601,2), ("P1",565,2), ("P2",518,1), ("P3",37,2), ("P4",8,0), ("P5",111,4)]
+	HouseSize, res = LevelingSeats(HA_Divisors["DHondt"], LevelVotes, 7)
+	print(HouseSize, res)
+	if [r[2] for r in res] != [r[2] for r in HighestAverages(HA_Divisors["DHondt"], \
+			AddInitial([Vote[:2] for Vote in LevelVotes]), HouseSize)]:
+		print("Mismatch:", HouseSize)
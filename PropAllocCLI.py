@@ -0,0 +1,175 @@
+#!python3
+#
+# Unified command line for these proportional-allocation files
+#
+# propalloc (subcommand) (args)
+# Subcommands that run the scripts, with their args:
+#   general -- GeneralAlloc.py
+#   house -- USHouseAlloc.py
+#   senate -- USSenateAlloc.py
+#   euparl -- EUParlAlloc.py
+#   series -- PropAllocSeries.py
+#   stream -- PropAllocStream.py
+#   scenarios -- PropAllocScenarios.py
+# alloc (method name) (total seats) (data file) [--min (seats)] [--max (seats)]
+#   [--threshold (fraction)]
+#   Allocates with one method, as for AllocByName in PropAlloc.py
+#   Data file: tab-delimited with each row having (party) (number of votes)
+#   Returns list of (party, votes, seats, direction)
+#
+# propalloc --batch
+# Reads allocation requests from stdin, one JSON object per line:
+#   method: method name, as for AllocByName
+#   votes: list of (party, # votes)
+#   seats: total number of seats
+#   min, max: (optional) minimum and maximum seats for each party
+#   threshold: (optional) electoral threshold, as a fraction of the total votes
+#   metrics: (optional) if true, also return the disproportionality metrics
+#   id: (optional) returned with the result
+# Writes one JSON object per line as each request is done:
+#   id, result: the method's output list, metrics: (if requested), or error: the error message
+# A request with a field of the wrong type, or that fails in any other way,
+# gets an error, and the batch goes on.
+# One interpreter runs all the requests, instead of one for each.
+#
+# The scripts and PropAlloc.py are only loaded when needed.
+#
+
+import sys
+import os
+
+
+Scripts = {"general": "GeneralAlloc.py", "house": "USHouseAlloc.py", \
+	"senate": "USSenateAlloc.py", "euparl": "EUParlAlloc.py", \
+	"series": "PropAllocSeries.py", "stream": "PropAllocStream.py", \
+	"scenarios": "PropAllocScenarios.py"}
+
+
+def RunScript(FileName, Args):
+	import runpy
+	Path = os.path.join(os.path.dirname(os.path.abspath(__file__)), FileName)
+	sys.argv = [Path] + Args
+	runpy.run_path(Path, run_name="__main__")
+
+
+def ReadVotes(FileName):
+	Votes = []
+	with open(FileName) as f:
+		for ln in f:
+			lnsp = ln.split('\t')
+			lnst = [s.strip() for s in lnsp]
+			if len(lnst) < 2: continue
+			Votes.append([lnst[0],int(lnst[1])])
+	return Votes
+
+def RunAlloc(Args):
+	from PropAlloc import AllocByName
+	res = AllocByName(Args.method, ReadVotes(Args.file), Args.seats, \
+		MinSeats=Args.min, MaxSeats=Args.max, Threshold=Args.threshold)
+	for r in res:
+		print('\t'.join([str(s) for s in r]))
+
+
+# JSON true and false are not numbers here
+def IsInteger(Value):
+	return isinstance(Value, int) and not isinstance(Value, bool)
+
+def IsNumber(Value):
+	return IsInteger(Value) or isinstance(Value, float)
+
+# Checks a request's fields before allocating, raising ValueError for the first bad one
+def CheckRequest(Request):
+	if not isinstance(Request.get("method"), str):
+		raise ValueError("method must be a string")
+	if not IsInteger(Request.get("seats")):
+		raise ValueError("seats must be an integer")
+	Votes = Request.get("votes")
+	if not isinstance(Votes, list):
+		raise ValueError("votes must be a list")
+	for Vote in Votes:
+		if not (isinstance(Vote, list) and len(Vote) == 2 and isinstance(Vote[0], str) \
+				and IsNumber(Vote[1])):
+			raise ValueError("each vote must be a [name, number] pair: %r" % (Vote,))
+	for Key in ("min", "max"):
+		Value = Request.get(Key)
+		if Value != None and not IsInteger(Value):
+			raise ValueError("%s must be an integer" % Key)
+	Threshold = Request.get("threshold")
+	if Threshold != None and not IsNumber(Threshold) and not (isinstance(Threshold, dict) \
+			and all(IsNumber(Value) for Value in Threshold.values())):
+		raise ValueError("threshold must be a number or an object of numbers")
+
+# One request: an associative array from a line of JSON
+# Any error is returned in the result, so one request cannot stop a batch
+def DoRequest(Request):
+	from PropAlloc import AllocByName, AllocMetrics
+	Result = {"id": Request.get("id")}
+	try:
+		CheckRequest(Request)
+		res = AllocByName(Request["method"], Request["votes"], Request["seats"], \
+			MinSeats=Request.get("min"), MaxSeats=Request.get("max"), \
+			Threshold=Request.get("threshold"))
+		Result["result"] = res
+		if Request.get("metrics"):
+			Result["metrics"] = AllocMetrics(res)
+	except Exception as Error:
+		Result["error"] = "%s: %s" % (type(Error).__name__, Error)
+	return Result
+
+def RunBatch(InFile, OutFile):
+	import json
+	for ln in InFile:
+		if ln.strip() == "": continue
+		try:
+			Request = json.loads(ln)
+		except ValueError as Error:
+			Result = {"id": None, "error": "%s: %s" % (type(Error).__name__, Error)}
+		else:
+			if isinstance(Request, dict):
+				Result = DoRequest(Request)
+			else:
+				Result = {"id": None, "error": "Request is not a JSON object"}
+		OutFile.write(json.dumps(Result) + "\n")
+		OutFile.flush()
+
+
+def Main(ArgList=None):
+	if ArgList == None: ArgList = sys.argv[1:]
+	
+	# The scripts get their args as they are
+	if len(ArgList) > 0 and ArgList[0] in Scripts:
+		RunScript(Scripts[ArgList[0]], ArgList[1:])
+		return
+	if ArgList == ["--batch"]:
+		RunBatch(sys.stdin, sys.stdout)
+		return
+	
+	import argparse
+	Parser = argparse.ArgumentParser(prog="propalloc", \
+		description="Proportional allocation. Subcommands " + ", ".join(Scripts) + \
+		" run those scripts with their args.")
+	Parser.add_argument("--batch", action="store_true", \
+		help="read JSON allocation requests from stdin, one per line")
+	Subparsers = Parser.add_subparsers(dest="command")
+	for Name, FileName in Scripts.items():
+		Subparsers.add_parser(Name, help="runs " + FileName)
+	AllocParser = Subparsers.add_parser("alloc", help="allocates with one method")
+	AllocParser.add_argument("method", help="method name: HA-DHondt, LR-Hare, AD-Webster, etc.")
+	AllocParser.add_argument("seats", type=int, help="total number of seats")
+	AllocParser.add_argument("file", help="data file: (party, votes)")
+	AllocParser.add_argument("--min", type=int, help="minimum seats for each party")
+	AllocParser.add_argument("--max", type=int, help="maximum seats for each party")
+	AllocParser.add_argument("--threshold", type=float, \
+		help="electoral threshold, as a fraction of the total votes")
+	Args = Parser.parse_args(ArgList)
+	
+	if Args.batch:
+		RunBatch(sys.stdin, sys.stdout)
+	elif Args.command == "alloc":
+		RunAlloc(Args)
+	else:
+		Parser.print_help()
+
+
+if __name__ == "__main__":
+	Main()
@@ -0,0 +1,160 @@
+#!python3
+#
+# Degressive-proportionality rules
+#
+# Rules for the European Parliament and the like, with a base number of seats
+# and a proportional part, with each member's seats between MinSeats and MaxSeats.
+# Each rule has the form
+#   seats = (rounded) Base + (weight)/(divisor)^(exponent)
+# with the divisor solved to give exactly TotalSeats.
+#
+# DP_Rules: an associative array
+#   Key: name of the rule
+#   Value: function of the list of populations and a parameter,
+#     returning the weights and the exponent
+# Key (name) -- (proportional part) for population p, largest population pmax, divisor d
+# Cambridge -- p/d: the Cambridge compromise
+# Parabolic -- (p/d)*(1 - p/(2*pmax)): a parabola with its vertex at the largest member
+# Power -- (p/d)^r: the power compromise, r = Param
+#
+# DegressiveRule(RuleName, Votes, TotalSeats, Base, Rounding, MinSeats, MaxSeats, Param)
+# Votes: (member, population)
+# Rounding is as for adjusted divisor: < 0: downward, = 0: nearest, > 0: upward (default)
+# Returns an associative array:
+#   Res: output list, as for the methods: (member, population, seats, direction)
+#   Divisor: the divisor, None if no divisor gives exactly TotalSeats
+#   Degressive: whether the seats never decrease and the populations per seat
+#     never decrease as the population increases
+#   Valid: whether there is an exact divisor and the seats are degressive
+#
+# SweepRules(Votes, Rules, Bases, Totals, Rounding, MinSeats, MaxSeats, Workers)
+# Rules: list of (rule name, parameter)
+# Bases, Totals: lists of base seats and total seats
+# Workers: (optional) number of processes for running the rules in parallel
+# Returns a list of (rule name, parameter, base, total, DegressiveRule's output)
+# for every combination
+#
+# The Cambridge Compromise - G. R. Grimmett et al.
+# https://www.europarl.europa.eu/RegData/etudes/etudes/join/2011/432760/IPOL-AFCO_ET(2011)432760_EN.pdf
+# Apportionment in the European Parliament - Wikipedia
+# https://en.wikipedia.org/wiki/Apportionment_in_the_European_Parliament
+#
+
+from concurrent.futures import ProcessPoolExecutor
+from PropAlloc import SortKeyFinal
+
+
+DP_Rules = {}
+
+DP_Rules["Cambridge"] = lambda Pops, Param: (list(Pops), 1.)
+
+def ParabolicWeights(Pops, Param):
+	PopMax = float(max(Pops))
+	return ([Pop*(1. - Pop/(2.*PopMax)) for Pop in Pops], 1.)
+
+DP_Rules["Parabolic"] = ParabolicWeights
+
+DP_Rules["Power"] = lambda Pops, Param: ([Pop**Param for Pop in Pops], Param)
+
+
+# Whether the seats and the populations per seat both never decrease
+# as the population increases
+def IsDegressive(Res):
+	Ordered = sorted(Res, key=lambda r: r[1])
+	for r1, r2 in zip(Ordered[:-1], Ordered[1:]):
+		if r1[1] == r2[1]: continue
+		if r2[2] < r1[2]: return False
+		if r2[1]*r1[2] < r1[1]*r2[2]: return False
+	return True
+
+
+# With X = 1/(divisor)^(exponent), each member's seats rise by one
+# at X = (seats - (rounding offset) - Base)/(weight).
+# Sorting those thresholds once gives the X values for every TotalSeats directly.
+def RuleThresholds(RuleName, Votes, Base, Rounding, MinSeats, MaxSeats, Param):
+	Weights, Exponent = DP_Rules[RuleName]([Vote[1] for Vote in Votes], Param)
+	if Rounding > 0:
+		Offset = 1.
+	elif Rounding < 0:
+		Offset = 0.
+	else:
+		Offset = 0.5
+	
+	# Seats as X goes to zero, from the base alone, and the thresholds after that
+	StartSeats = MinSeats
+	for Seats in range(MinSeats+1, MaxSeats+1):
+		if Seats - Offset - Base <= 0: StartSeats = Seats
+	Thresholds = []
+	for k, Weight in enumerate(Weights):
+		for Seats in range(StartSeats+1, MaxSeats+1):
+			Thresholds.append(((Seats - Offset - Base)/Weight, k))
+	Thresholds.sort()
+	
+	return (Weights, Exponent, Offset, StartSeats, Thresholds)
+
+def RuleAlloc(Votes, TotalSeats, Base, MinSeats, MaxSeats, Prep):
+	Weights, Exponent, Offset, StartSeats, Thresholds = Prep
+	
+	# The X values that give TotalSeats are between two thresholds;
+	# if those are equal, it is a tie, and there is no divisor
+	NumAbove = TotalSeats - StartSeats*len(Weights)
+	Divisor = None
+	if 0 <= NumAbove <= len(Thresholds):
+		XLower = Thresholds[NumAbove-1][0] if NumAbove > 0 else 0.
+		XUpper = Thresholds[NumAbove][0] if NumAbove < len(Thresholds) else 2.*XLower
+		if XUpper > XLower:
+			X = 0.5*(XLower + XUpper)
+			Divisor = (1./X)**(1./Exponent)
+	NumAbove = min(max(NumAbove, 0), len(Thresholds))
+	
+	Seats = [StartSeats]*len(Weights)
+	for X, k in Thresholds[:NumAbove]:
+		Seats[k] += 1
+	
+	Res = []
+	for Vote, Weight, NumSeats in zip(Votes, Weights, Seats):
+		Raw = Base + Weight*(0. if Divisor == None else Divisor**(-Exponent))
+		Dir = 0
+		if NumSeats == MinSeats and Raw < MinSeats - Offset:
+			Dir = -1
+		elif NumSeats == MaxSeats and Raw >= MaxSeats + 1 - Offset:
+			Dir = 1
+		Res.append([Vote[0], Vote[1], NumSeats, Dir])
+	Res.sort(key=SortKeyFinal)
+	
+	Degressive = IsDegressive(Res)
+	return {"Res": Res, "Divisor": Divisor, "Degressive": Degressive, \
+		"Valid": Divisor != None and Degressive}
+
+def DegressiveRule(RuleName, Votes, TotalSeats, Base, *, Rounding=1, \
+		MinSeats=None, MaxSeats=None, Param=None):
+	if MinSeats == None: MinSeats = 0
+	if MaxSeats == None: MaxSeats = TotalSeats
+	Prep = RuleThresholds(RuleName, Votes, Base, Rounding, MinSeats, MaxSeats, Param)
+	return RuleAlloc(Votes, TotalSeats, Base, MinSeats, MaxSeats, Prep)
+
+
+# One rule and base for all the totals
+def SweepOne(RuleName, Param, Base, Votes, Totals, Rounding, MinSeats, MaxSeats):
+	if MinSeats == None: MinSeats = 0
+	if MaxSeats == None: MaxSeats = max(Totals)
+	Prep = RuleThresholds(RuleName, Votes, Base, Rounding, MinSeats, MaxSeats, Param)
+	return [(RuleName, Param, Base, Total, \
+		RuleAlloc(Votes, Total, Base, MinSeats, MaxSeats, Prep)) for Total in Totals]
+
+def SweepRules(Votes, Rules, Bases, Totals, *, Rounding=1, MinSeats=None, MaxSeats=None, \
+		Workers=None):
+	Tasks = [(RuleName, Param, Base) for RuleName, Param in Rules for Base in Bases]
+	if Workers == None or Workers <= 1:
+		Results = [SweepOne(*Task, Votes, Totals, Rounding, MinSeats, MaxSeats) \
+			for Task in Tasks]
+	else:
+		with ProcessPoolExecutor(Workers) as Pool:
+			Futures = [Pool.submit(SweepOne, *Task, Votes, Totals, Rounding, \
+				MinSeats, MaxSeats) for Task in Tasks]
+			Results = [Future.result() for Future in Futures]
+	
+	Rows = []
+	for Result in Results:
+		Rows += Result
+	return Rows
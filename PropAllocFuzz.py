@@ -0,0 +1,364 @@
+#!python3
+#
+# Differential testing of the allocation engines
+#
+# Random and adversarial cases are run through every engine for a method family,
+# and each engine's output is compared with the reference engine's output,
+# seat for seat and direction for direction. Any disagreement is shrunk
+# to a small case that still shows it.
+#
+# Args (optional):
+# Number of cases (default: 10000)
+# Random seed (default: 0)
+# Number of worker processes (default: 1)
+# Engine names to include besides the default ones, like ParallelAdjustDivisor
+# Returns:
+# for each engine: (family, engine, cases, seconds, cases per second)
+# for each disagreement: the engines and the minimized case
+#
+# FZ_Engines: an associative array
+#   Key: method family: "HA", "LR", "AD", as for AllocByName in PropAlloc.py
+#   Value: list of (engine name, function of a case, exact for ties),
+#     with the first one the reference
+# An engine that is not exact for ties is only compared where the reference has no tie,
+# counting a party at its maximum whose next seat has the last seat's average.
+# FZ_SlowEngines: the engines left out unless named, since each of their calls
+#   starts its worker processes
+#
+# A case is an associative array with
+#   Family: method family
+#   Method: name in HA_Divisors, LR_QuotaAdjust, or AD_Rounding
+#   Votes: list of (party, # votes)
+#   TotalSeats
+#   MinSeats, MaxSeats: None if absent; for HA, MinSeats is the initial seats
+#   Kind: how it was made: random, neartie, huge, tight
+#
+# MakeCase(Rng, Family, Kind)
+# Returns a random case of that kind
+#
+# CompareEngines(Case, EngineNames)
+# Returns (list of disagreeing engine names, associative array of engine name: seconds)
+#
+# MinimizeCase(Case, EngineNames)
+# Returns a smaller case with a disagreement: fewer parties, fewer seats,
+# smaller votes, no minimum or maximum, as far as it can go
+#
+# Fuzz(NumCases, Seed, EngineNames, Workers, BatchSize, MaxMinimize)
+# EngineNames: (optional) engines to run (default: all but FZ_SlowEngines)
+# MaxMinimize: (optional) number of disagreements to minimize (default: 10)
+# Returns an associative array:
+#   Cases: associative array of family: number of cases
+#   Times: associative array of engine name: seconds
+#   NumDisagreements: number of cases with a disagreement
+#   Disagreements: list of (engine names, minimized case) for the first MaxMinimize of them
+#
+
+import sys
+import time
+from random import Random
+from concurrent.futures import ProcessPoolExecutor
+from PropAlloc import HighestAverages, HighestAveragesFrom, HA_Divisors, AddInitial, IsTied
+from PropAlloc import LargestRemainder, LR_QuotaAdjust
+from PropAlloc import AdjustDivisor, AD_Rounding
+from PropAlloc import OptimalApportionment, DivisorObjective
+
+
+def HA_Votes(Case):
+	Initial = Case["MinSeats"] if Case["MinSeats"] != None else 0
+	return AddInitial(Case["Votes"], Initial)
+
+def RunHighestAverages(Case):
+	return HighestAverages(HA_Divisors[Case["Method"]], HA_Votes(Case), \
+		Case["TotalSeats"], MaxSeats=Case["MaxSeats"])
+
+def RunHighestAveragesFrom(Case):
+	return HighestAveragesFrom(HA_Divisors[Case["Method"]], HA_Votes(Case), \
+		Case["TotalSeats"], {}, MaxSeats=Case["MaxSeats"])
+
+# Starting from one more than the rounded-down proportional seats,
+# so that seats have to be taken away as well as added
+def RunHighestAveragesNearby(Case):
+	TotalVotes = sum(Vote[1] for Vote in Case["Votes"])
+	StartSeats = {Vote[0]: Vote[1]*Case["TotalSeats"]//max(TotalVotes,1) + 1 \
+		for Vote in Case["Votes"]}
+	return HighestAveragesFrom(HA_Divisors[Case["Method"]], HA_Votes(Case), \
+		Case["TotalSeats"], StartSeats, MaxSeats=Case["MaxSeats"])
+
+def RunParallelHighestAverages(Case):
+	from PropAllocParallel import ParallelHighestAverages
+	return ParallelHighestAverages(HA_Divisors[Case["Method"]], HA_Votes(Case), \
+		Case["TotalSeats"], MaxSeats=Case["MaxSeats"], Workers=2)
+
+# The initial seats get no direction in highest averages
+def RunOptimalApportionment(Case):
+	Res = OptimalApportionment(DivisorObjective(HA_Divisors[Case["Method"]]), \
+		Case["Votes"], Case["TotalSeats"], MinSeats=Case["MinSeats"], MaxSeats=Case["MaxSeats"])
+	return [r[:3] + [max(r[3], 0)] for r in Res]
+
+def RunLargestRemainder(Case):
+	return LargestRemainder(LR_QuotaAdjust[Case["Method"]], Case["Votes"], \
+		Case["TotalSeats"], MinSeats=Case["MinSeats"], MaxSeats=Case["MaxSeats"])
+
+def RunAdjustDivisor(Case):
+	return AdjustDivisor(AD_Rounding[Case["Method"]], Case["Votes"], \
+		Case["TotalSeats"], MinSeats=Case["MinSeats"], MaxSeats=Case["MaxSeats"])
+
+def RunParallelAdjustDivisor(Case):
+	from PropAllocParallel import ParallelAdjustDivisor
+	return ParallelAdjustDivisor(AD_Rounding[Case["Method"]], Case["Votes"], \
+		Case["TotalSeats"], MinSeats=Case["MinSeats"], MaxSeats=Case["MaxSeats"], Workers=2)
+
+FZ_Engines = {}
+
+FZ_Engines["HA"] = [("HighestAverages", RunHighestAverages, True), \
+	("HighestAveragesFrom", RunHighestAveragesFrom, False), \
+	("HighestAveragesNearby", RunHighestAveragesNearby, False), \
+	("ParallelHighestAverages", RunParallelHighestAverages, True), \
+	("OptimalApportionment", RunOptimalApportionment, False)]
+
+FZ_Engines["LR"] = [("LargestRemainder", RunLargestRemainder, True)]
+
+FZ_Engines["AD"] = [("AdjustDivisor", RunAdjustDivisor, True), \
+	("ParallelAdjustDivisor", RunParallelAdjustDivisor, True)]
+
+FZ_SlowEngines = ("ParallelHighestAverages", "ParallelAdjustDivisor")
+
+def DefaultEngines():
+	return [Engine[0] for Family in FZ_Engines.values() for Engine in Family \
+		if Engine[0] not in FZ_SlowEngines]
+
+
+# Divisors that are zero for no seats need at least one initial seat
+ZeroDivisors = [Name for Name, Func in HA_Divisors.items() if Func(0) == 0]
+
+FZ_Kinds = ("random", "neartie", "huge", "tight")
+
+def MakeCase(Rng, Family, Kind):
+	if Family == "HA":
+		Method = Rng.choice(sorted(HA_Divisors))
+	elif Family == "LR":
+		Method = Rng.choice(sorted(LR_QuotaAdjust))
+	else:
+		Method = Rng.choice(sorted(AD_Rounding))
+	NumParties = Rng.randint(1, 12)
+	
+	if Kind == "neartie":
+		# Multiples of a few base numbers, some off by one
+		Bases = [Rng.randint(1, 1000) for k in range(Rng.randint(1, 3))]
+		Counts = [Rng.choice(Bases)*Rng.randint(1, 6) + Rng.choice((0, 0, -1, 1)) \
+			for k in range(NumParties)]
+	elif Kind == "huge":
+		Counts = [Rng.randint(0, 2**52) for k in range(NumParties)]
+	else:
+		Counts = [Rng.randint(0, 100_000) for k in range(NumParties)]
+	Counts = [max(Count, 0) for Count in Counts]
+	if sum(Counts) == 0: Counts[0] = 1
+	Votes = [("P%d" % k, Count) for k, Count in enumerate(Counts)]
+	
+	TotalSeats = Rng.randint(1, 20*NumParties)
+	MinSeats = None
+	MaxSeats = None
+	if Kind == "tight" or Rng.random() < 0.3:
+		Share = TotalSeats//NumParties
+		if Rng.random() < 0.5:
+			MinSeats = Rng.randint(0, Share)
+		if Rng.random() < 0.5:
+			MaxSeats = Rng.randint(max(Share,1), Share + 2)
+	
+	return FixCase({"Family": Family, "Method": Method, "Votes": Votes, \
+		"TotalSeats": TotalSeats, "MinSeats": MinSeats, "MaxSeats": MaxSeats, "Kind": Kind})
+
+# Keeps a case within what all the methods can do:
+# enough seats for the minimums, room for them under the maximums,
+# and an initial seat where the divisor for no seats is zero.
+# Adams rounding gives a seat to every party with votes.
+def FixCase(Case):
+	NumParties = len(Case["Votes"])
+	if Case["Family"] == "HA" and Case["Method"] in ZeroDivisors:
+		Case["MinSeats"] = max(Case["MinSeats"] or 0, 1)
+	if Case["Family"] == "AD" and AD_Rounding[Case["Method"]] > 0:
+		Case["TotalSeats"] = max(Case["TotalSeats"], NumParties + 1)
+	if Case["MinSeats"] != None:
+		Case["TotalSeats"] = max(Case["TotalSeats"], Case["MinSeats"]*NumParties + 1)
+	if Case["MaxSeats"] != None:
+		Case["MaxSeats"] = max(Case["MaxSeats"], Case["MinSeats"] or 0)
+		if Case["MaxSeats"]*NumParties <= Case["TotalSeats"]:
+			Case["MaxSeats"] = Case["TotalSeats"]//NumParties + 1
+	return Case
+
+
+def FindEngines(EngineNames):
+	Engines = []
+	for Family, FamilyEngines in FZ_Engines.items():
+		for Engine in FamilyEngines:
+			if Engine[0] in EngineNames:
+				Engines.append((Family,) + Engine)
+	return Engines
+
+def RunEngine(Func, Case):
+	try:
+		return Func(Case)
+	except (ValueError, ZeroDivisionError, OverflowError) as Error:
+		return type(Error).__name__
+
+def CompareEngines(Case, EngineNames):
+	Engines = FZ_Engines[Case["Family"]]
+	Times = {}
+	Start = time.perf_counter()
+	Reference = RunEngine(Engines[0][1], Case)
+	Times[Engines[0][0]] = time.perf_counter() - Start
+	
+	Tied = None
+	Disagree = []
+	for Name, Func, TieExact in Engines[1:]:
+		if Name not in EngineNames: continue
+		Start = time.perf_counter()
+		Res = RunEngine(Func, Case)
+		Times[Name] = time.perf_counter() - Start
+		if Res == Reference: continue
+		if not TieExact:
+			if Tied == None: Tied = HasTie(Case)
+			if Tied: continue
+		Disagree.append(Name)
+	
+	return (Disagree, Times)
+
+# Ties for the deciding seat, and also a party at its maximum whose next seat
+# has the last seat's average, since whether it gets its direction
+# depends on the tie-break
+def HasTie(Case):
+	DivisorFunc = HA_Divisors[Case["Method"]]
+	Votes = HA_Votes(Case)
+	Ties = {}
+	Res = HighestAverages(DivisorFunc, Votes, Case["TotalSeats"], \
+		MaxSeats=Case["MaxSeats"], Ties=Ties)
+	if len(Ties["Parties"]) > 0: return True
+	if Case["MaxSeats"] == None: return False
+	
+	Initial = {Vote[0]: Vote[2] for Vote in Votes}
+	Averages = [r[1]/float(DivisorFunc(r[2]-1)) for r in Res if r[2] > Initial[r[0]]]
+	if len(Averages) == 0: return False
+	LastAvg = min(Averages)
+	return any(r[2] >= Case["MaxSeats"] and \
+		IsTied(r[1]/float(DivisorFunc(r[2])), LastAvg, abs(LastAvg)) for r in Res)
+
+
+# Smaller versions of a case: one fewer party, fewer seats, smaller votes,
+# no minimum or maximum
+def ShrunkCases(Case):
+	Votes = Case["Votes"]
+	for k in range(len(Votes)):
+		if len(Votes) > 1:
+			yield dict(Case, Votes=Votes[:k] + Votes[k+1:])
+	for TotalSeats in (Case["TotalSeats"]//2, Case["TotalSeats"] - 1):
+		if TotalSeats >= 1:
+			yield dict(Case, TotalSeats=TotalSeats)
+	for k, Vote in enumerate(Votes):
+		for Count in (Vote[1]//2, Vote[1]//10, Vote[1] - 1):
+			if 0 <= Count < Vote[1]:
+				yield dict(Case, Votes=Votes[:k] + [(Vote[0], Count)] + Votes[k+1:])
+	if Case["MinSeats"] != None:
+		yield dict(Case, MinSeats=None)
+	if Case["MaxSeats"] != None:
+		yield dict(Case, MaxSeats=None)
+
+def CaseSize(Case):
+	return (len(Case["Votes"]), Case["TotalSeats"], sum(Vote[1] for Vote in Case["Votes"]), \
+		Case["MinSeats"] != None, Case["MaxSeats"] != None)
+
+def MinimizeCase(Case, EngineNames):
+	Disagree = CompareEngines(Case, EngineNames)[0]
+	Shrinking = True
+	while Shrinking:
+		Shrinking = False
+		for NewCase in ShrunkCases(Case):
+			NewCase = FixCase(dict(NewCase))
+			if sum(Vote[1] for Vote in NewCase["Votes"]) == 0: continue
+			if CaseSize(NewCase) >= CaseSize(Case): continue
+			NewDisagree = CompareEngines(NewCase, EngineNames)[0]
+			if any(Name in NewDisagree for Name in Disagree):
+				Case = NewCase
+				Disagree = NewDisagree
+				Shrinking = True
+				break
+	return Case
+
+
+# One batch of cases, with its own random-number generator
+def FuzzBatch(NumCases, Seed, Batch, EngineNames):
+	Rng = Random("%s-%d" % (Seed, Batch))
+	Families = sorted(set(Engine[0] for Engine in FindEngines(EngineNames)))
+	Cases = {Family: 0 for Family in Families}
+	Times = {}
+	Disagreements = []
+	if len(Families) == 0: return (Cases, Times, Disagreements)
+	
+	for n in range(NumCases):
+		Case = MakeCase(Rng, Rng.choice(Families), Rng.choice(FZ_Kinds))
+		Cases[Case["Family"]] += 1
+		Disagree, CaseTimes = CompareEngines(Case, EngineNames)
+		for Name, Seconds in CaseTimes.items():
+			Times[Name] = Times.get(Name,0.) + Seconds
+		if len(Disagree) > 0:
+			Disagreements.append((Disagree, Case))
+	
+	return (Cases, Times, Disagreements)
+
+def Fuzz(NumCases, Seed=0, *, EngineNames=None, Workers=None, BatchSize=1000, \
+		MaxMinimize=10):
+	if EngineNames == None: EngineNames = DefaultEngines()
+	Batches = [(Batch, min(BatchSize, NumCases - Batch*BatchSize)) \
+		for Batch in range((NumCases + BatchSize - 1)//BatchSize)]
+	
+	if Workers == None or Workers <= 1:
+		Results = [FuzzBatch(Size, Seed, Batch, EngineNames) for Batch, Size in Batches]
+	else:
+		with ProcessPoolExecutor(Workers) as Pool:
+			Futures = [Pool.submit(FuzzBatch, Size, Seed, Batch, EngineNames) \
+				for Batch, Size in Batches]
+			Results = [Future.result() for Future in Futures]
+	
+	Report = {"Cases": {}, "Times": {}, "Disagreements": []}
+	for Cases, Times, Disagreements in Results:
+		for Family, Count in Cases.items():
+			Report["Cases"][Family] = Report["Cases"].get(Family,0) + Count
+		for Name, Seconds in Times.items():
+			Report["Times"][Name] = Report["Times"].get(Name,0.) + Seconds
+		Report["Disagreements"] += Disagreements
+	
+	Report["NumDisagreements"] = len(Report["Disagreements"])
+	Report["Disagreements"] = [(Disagree, MinimizeCase(Case, Disagree)) \
+		for Disagree, Case in Report["Disagreements"][:MaxMinimize]]
+	return Report
+
+
+if __name__ == "__main__":
+
+	argn = 1
+	NumCases = int(sys.argv[argn]) if len(sys.argv) > argn else 10000
+	argn += 1
+	Seed = int(sys.argv[argn]) if len(sys.argv) > argn else 0
+	argn += 1
+	Workers = int(sys.argv[argn]) if len(sys.argv) > argn else 1
+	argn += 1
+	EngineNames = DefaultEngines() + sys.argv[argn:]
+	
+	StartTime = time.perf_counter()
+	Report = Fuzz(NumCases, Seed, EngineNames=EngineNames, Workers=Workers)
+	print("Total seconds: %.2f" % (time.perf_counter() - StartTime))
+	
+	print('\t'.join(["Family", "Engine", "Cases", "Seconds", "Cases/s"]))
+	for Family, Engines in FZ_Engines.items():
+		for Engine in Engines:
+			if Engine[0] not in Report["Times"]: continue
+			Seconds = Report["Times"][Engine[0]]
+			Count = Report["Cases"][Family]
+			print('\t'.join([Family, Engine[0], str(Count), "%.3f" % Seconds, \
+				"%.0f" % (Count/Seconds if Seconds > 0 else 0)]))
+	
+	print()
+	print("Disagreements:", Report["NumDisagreements"])
+	if Report["NumDisagreements"] > len(Report["Disagreements"]):
+		print("Minimized: the first", len(Report["Disagreements"]))
+	for Disagree, Case in Report["Disagreements"]:
+		print(' '.join(Disagree), Case)
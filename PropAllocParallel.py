@@ -0,0 +1,366 @@
+#!python3
+#
+# Parallel engine for one very large allocation
+#
+# For millions of parties (or schools, or the like) and millions of seats.
+# The votes are put into shared memory once, and each worker process goes over
+# its part of them for each trial divisor or average, returning partial seat counts
+# that are added up. The results are identical to the serial methods' results.
+#
+# ParallelAdjustDivisor(RoundDir, Votes, TotalSeats, MinSeats, MaxSeats, Ties, Workers)
+# Same as AdjustDivisor in PropAlloc.py: it tries the same divisors
+#
+# ParallelHighestAverages(DivisorFunc, Votes, TotalSeats, MaxSeats, Ties, Workers)
+# Same as HighestAverages in PropAlloc.py, with ties also going to the earliest parties,
+# and reported in Ties the same way.
+# Instead of giving the seats one at a time, it finds the last seat's average
+# by counting the averages above trial values, then collecting the few left between them.
+# DivisorFunc: one of HA_Divisors, or a function defined at the top level of a module,
+# so that the worker processes can get it
+#
+# Workers: (optional) number of processes (default: number of CPUs)
+# The numbers of votes must be less than 2^53 to be stored exactly.
+#
+
+import os
+from array import array
+from math import floor, ceil
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from PropAlloc import HA_Divisors, AD_FindDivisor, SortKeyFinal, ClearTies, IsTied
+
+
+# The worker processes' views of the shared data
+Shared = {}
+
+def AttachShared(Name, NumRows, DivisorRef):
+	Shm = shared_memory.SharedMemory(name=Name)
+	Shared["Shm"] = Shm
+	Shared["Votes"] = Shm.buf[:8*NumRows].cast('d')
+	Shared["Seats"] = Shm.buf[8*NumRows:16*NumRows].cast('q')
+	if isinstance(DivisorRef, str):
+		Shared["DivisorFunc"] = HA_Divisors[DivisorRef]
+	else:
+		Shared["DivisorFunc"] = DivisorRef
+
+
+# Votes, and initial seats if any, in shared memory,
+# and the worker processes attached to it
+def StartPool(Workers, VoteCol, SeatCol=None, DivisorFunc=None):
+	NumRows = len(VoteCol)
+	Shm = shared_memory.SharedMemory(create=True, size=max(16*NumRows,1))
+	Buf = Shm.buf
+	Buf[:8*NumRows].cast('d')[:] = array('d', VoteCol)
+	if SeatCol != None:
+		Buf[8*NumRows:16*NumRows].cast('q')[:] = array('q', SeatCol)
+	del Buf
+	
+	# Lambdas can't be sent to the worker processes, so use the name if there is one
+	DivisorRef = DivisorFunc
+	for Name, Func in HA_Divisors.items():
+		if Func is DivisorFunc:
+			DivisorRef = Name
+			break
+	
+	Pool = ProcessPoolExecutor(Workers, initializer=AttachShared, \
+		initargs=(Shm.name, NumRows, DivisorRef))
+	return (Shm, Pool)
+
+def StopPool(Shm, Pool):
+	Pool.shutdown()
+	Shm.close()
+	Shm.unlink()
+
+# Each worker's (start, end) of the rows
+def RowChunks(NumRows, Workers):
+	Bounds = [(NumRows*k)//Workers for k in range(Workers+1)]
+	return [(Bounds[k], Bounds[k+1]) for k in range(Workers) if Bounds[k+1] > Bounds[k]]
+
+# Applies Func(start, end, *args) to each chunk
+def MapChunks(Pool, Chunks, Func, *args):
+	return list(Pool.map(Func, *zip(*[Chunk + args for Chunk in Chunks])))
+
+
+# Adjusted divisor
+
+def RoundFunc(RoundDir):
+	if RoundDir > 0:
+		return ceil
+	elif RoundDir < 0:
+		return floor
+	else:
+		return round
+
+# As CountSeatsForDvsr, returning seats and directions if Full
+def AD_CountChunk(Start, End, Dvsr, RoundDir, MinSeats, MaxSeats, Full=False):
+	Votes = Shared["Votes"]
+	Rndf = RoundFunc(RoundDir)
+	IsMin = MinSeats != None
+	IsMax = MaxSeats != None
+	
+	AllocSeats = 0
+	SeatList = []
+	DirList = []
+	for k in range(Start, End):
+		Seats = Rndf(Votes[k]/Dvsr)
+		Dir = 0
+		if IsMin and Seats < MinSeats:
+			Seats = MinSeats
+			Dir = -1
+		elif IsMax and Seats > MaxSeats:
+			Seats = MaxSeats
+			Dir = 1
+		AllocSeats += Seats
+		if Full:
+			SeatList.append(Seats)
+			DirList.append(Dir)
+	
+	return (SeatList, DirList) if Full else AllocSeats
+
+def ParallelAdjustDivisor(RoundDir, Votes, TotalSeats, *, MinSeats=None, MaxSeats=None, \
+		Ties=None, Workers=None):
+	ClearTies(Ties)
+	if Workers == None: Workers = os.cpu_count()
+	
+	TotalVotes = 0
+	for Vote in Votes:
+		TotalVotes += Vote[1]
+	
+	Shm, Pool = StartPool(Workers, [Vote[1] for Vote in Votes])
+	try:
+		Chunks = RowChunks(len(Votes), Workers)
+		def SeatsForDvsr(Dvsr, Full=False):
+			return MapChunks(Pool, Chunks, AD_CountChunk, Dvsr, RoundDir, \
+				MinSeats, MaxSeats, Full)
+		
+		Dvsr, Dvsr1, Dvsr2 = AD_FindDivisor(lambda Dvsr: sum(SeatsForDvsr(Dvsr)), \
+			TotalVotes, TotalSeats)
+		
+		VList = [list(Vote[:2]) for Vote in Votes]
+		k = 0
+		for SeatList, DirList in SeatsForDvsr(Dvsr, True):
+			for Seats, Dir in zip(SeatList, DirList):
+				VList[k] += [Seats, Dir]
+				k += 1
+		
+		# No divisor gives the right number: a tie between the parties
+		# whose numbers of seats differ across the interval
+		if Dvsr1 != None and Ties != None:
+			Seats1 = [Seats for SeatList, DirList in SeatsForDvsr(Dvsr1, True) \
+				for Seats in SeatList]
+			Seats2 = [Seats for SeatList, DirList in SeatsForDvsr(Dvsr2, True) \
+				for Seats in SeatList]
+			for Vote, NumSeats1, NumSeats2 in zip(VList, Seats1, Seats2):
+				if NumSeats1 != NumSeats2:
+					Ties["Parties"].append(Vote[0])
+					if Vote[2] == NumSeats1:
+						Ties["Winners"].append(Vote[0])
+			Ties["Seats"] = TotalSeats - sum(Seats2)
+	finally:
+		StopPool(Shm, Pool)
+	
+	VList.sort(key=SortKeyFinal)
+	return VList
+
+
+# Highest averages
+
+# The number of seats whose averages are above Avg, from Init seats up to Cap seats,
+# by galloping then bisection
+def SeatsAbove(NumVotes, Init, Cap, Avg, DivisorFunc):
+	if Init >= Cap or NumVotes/float(DivisorFunc(Init)) <= Avg: return Init
+	Lo = Init
+	Step = 1
+	while True:
+		Hi = Lo + Step
+		if Hi >= Cap:
+			Hi = Cap
+			break
+		if NumVotes/float(DivisorFunc(Hi)) <= Avg: break
+		Lo = Hi
+		Step *= 2
+	
+	# The average for Lo is above, and the one for Hi is not, or Hi is the cap
+	while Hi - Lo > 1:
+		Mid = (Lo + Hi)//2
+		if NumVotes/float(DivisorFunc(Mid)) > Avg:
+			Lo = Mid
+		else:
+			Hi = Mid
+	return Hi
+
+def CapFor(Init, Extra, MaxSeats):
+	return Init + Extra if MaxSeats == None else min(Init + Extra, MaxSeats)
+
+# Number of averages above Avg; with Full, each party's seats for them
+# and the parties whose next average equals Avg
+def HA_CountChunk(Start, End, Avg, Extra, MaxSeats, Full=False):
+	Votes = Shared["Votes"]
+	Inits = Shared["Seats"]
+	DivisorFunc = Shared["DivisorFunc"]
+	
+	Count = 0
+	SeatList = []
+	TiedList = []
+	for k in range(Start, End):
+		Cap = CapFor(Inits[k], Extra, MaxSeats)
+		Seats = SeatsAbove(Votes[k], Inits[k], Cap, Avg, DivisorFunc)
+		Count += Seats - Inits[k]
+		if Full:
+			SeatList.append(Seats)
+			if Seats < Cap and Votes[k]/float(DivisorFunc(Seats)) == Avg:
+				TiedList.append(k)
+	
+	return (SeatList, TiedList) if Full else Count
+
+# The averages above AvgLo and not above AvgHi
+def HA_AveragesChunk(Start, End, AvgLo, AvgHi, Extra, MaxSeats):
+	Votes = Shared["Votes"]
+	Inits = Shared["Seats"]
+	DivisorFunc = Shared["DivisorFunc"]
+	
+	Avgs = []
+	for k in range(Start, End):
+		Cap = CapFor(Inits[k], Extra, MaxSeats)
+		SeatsLo = SeatsAbove(Votes[k], Inits[k], Cap, AvgLo, DivisorFunc)
+		SeatsHi = SeatsAbove(Votes[k], Inits[k], Cap, AvgHi, DivisorFunc)
+		for Seats in range(SeatsHi, SeatsLo):
+			Avgs.append(Votes[k]/float(DivisorFunc(Seats)))
+	return Avgs
+
+def ParallelHighestAverages(DivisorFunc, Votes, TotalSeats, *, MaxSeats=None, \
+		Ties=None, Workers=None, MaxCollect=10000):
+	IsMax = MaxSeats != None
+	ClearTies(Ties)
+	if Workers == None: Workers = os.cpu_count()
+	
+	# VList members have party, votes, seats, direction
+	VList = [list(Vote[:3]) + [0] for Vote in Votes]
+	for Vote in VList:
+		if IsMax and Vote[2] > MaxSeats:
+			Vote[2] = MaxSeats
+			Vote[3] = 1
+	
+	RemainingSeats = TotalSeats - sum(Vote[2] for Vote in VList)
+	if RemainingSeats <= 0:
+		VList.sort(key=SortKeyFinal)
+		return VList
+	
+	Shm, Pool = StartPool(Workers, [Vote[1] for Vote in VList], \
+		[Vote[2] for Vote in VList], DivisorFunc)
+	try:
+		Chunks = RowChunks(len(VList), Workers)
+		def CountAbove(Avg, Full=False):
+			return MapChunks(Pool, Chunks, HA_CountChunk, Avg, RemainingSeats, \
+				MaxSeats, Full)
+		
+		# Find the last seat's average: the one with fewer than RemainingSeats above it
+		# and at least RemainingSeats at or above it
+		if sum(CountAbove(-1.)) < RemainingSeats:
+			# Not enough: every party ends up at its maximum
+			LastAvg = None
+			for Vote in VList:
+				Vote[2] = MaxSeats
+		elif sum(CountAbove(0.)) < RemainingSeats:
+			LastAvg = 0.
+		else:
+			# Bracket it, then narrow it down
+			TotalVotes = sum(Vote[1] for Vote in VList)
+			Avg = float(TotalVotes)/float(TotalSeats)
+			Count = sum(CountAbove(Avg))
+			if Count >= RemainingSeats:
+				AvgLo, CountLo = Avg, Count
+				while Count >= RemainingSeats:
+					Avg *= 2
+					Count = sum(CountAbove(Avg))
+				AvgHi, CountHi = Avg, Count
+			else:
+				AvgHi, CountHi = Avg, Count
+				while Count < RemainingSeats:
+					Avg /= 2
+					Count = sum(CountAbove(Avg))
+				AvgLo, CountLo = Avg, Count
+			
+			while CountLo - CountHi > MaxCollect:
+				Avg = 0.5*(AvgLo + AvgHi)
+				if Avg <= AvgLo or Avg >= AvgHi: break
+				Count = sum(CountAbove(Avg))
+				if Count >= RemainingSeats:
+					AvgLo, CountLo = Avg, Count
+				else:
+					AvgHi, CountHi = Avg, Count
+			
+			if CountLo - CountHi > MaxCollect:
+				# All of them are equal
+				LastAvg = AvgHi
+			else:
+				Avgs = []
+				for ChunkAvgs in MapChunks(Pool, Chunks, HA_AveragesChunk, AvgLo, AvgHi, \
+						RemainingSeats, MaxSeats):
+					Avgs += ChunkAvgs
+				Avgs.sort(reverse=True)
+				LastAvg = Avgs[RemainingSeats - CountHi - 1]
+		
+		if LastAvg != None:
+			# Above the last average, then the tied ones in order
+			k = 0
+			TiedList = []
+			for SeatList, ChunkTied in CountAbove(LastAvg, True):
+				for Seats in SeatList:
+					VList[k][2] = Seats
+					k += 1
+				TiedList += ChunkTied
+			NumTiedSeats = RemainingSeats - sum(CountAbove(LastAvg))
+			for k in TiedList[:NumTiedSeats]:
+				VList[k][2] += 1
+			LastWinner = TiedList[NumTiedSeats-1]
+	finally:
+		StopPool(Shm, Pool)
+	
+	# Parties at their maximum whose next average would have been taken
+	if IsMax:
+		for k, Vote in enumerate(VList):
+			if Vote[3] != 0 or Vote[2] < MaxSeats: continue
+			if LastAvg == None:
+				Vote[3] = 1
+				continue
+			NextAvg = Vote[1]/float(DivisorFunc(Vote[2]))
+			if NextAvg > LastAvg or (NextAvg == LastAvg and k < LastWinner):
+				Vote[3] = 1
+	
+	# Ties: as in HighestAverages, the parties whose last seat or next seat
+	# has the last seat's average
+	if Ties != None and LastAvg != None:
+		Scale = abs(LastAvg)
+		Winners = []
+		Losers = []
+		for Vote, InVote in zip(VList, Votes):
+			InitSeats = min(InVote[2], MaxSeats) if IsMax else InVote[2]
+			if Vote[2] > InitSeats and \
+					IsTied(Vote[1]/float(DivisorFunc(Vote[2]-1)), LastAvg, Scale):
+				Winners.append(Vote[0])
+			elif not (IsMax and Vote[2] >= MaxSeats) and \
+					IsTied(Vote[1]/float(DivisorFunc(Vote[2])), LastAvg, Scale):
+				Losers.append(Vote[0])
+		if len(Losers) > 0:
+			Ties["Parties"] = Winners + Losers
+			Ties["Winners"] = Winners
+			Ties["Seats"] = len(Winners)
+	
+	VList.sort(key=SortKeyFinal)
+	return VList
+
+
+# For debugging
+if __name__ == "__main__":
+
+	from random import Random
+	from PropAlloc import HighestAverages, AdjustDivisor, AddInitial
+	
+	Rng = Random(1)
+	Votes = [("S%d" % k, Rng.randrange(1, 10**6)) for k in range(2000)]
+	
+	print(AdjustDivisor(0, Votes, 100_000) == \
+		ParallelAdjustDivisor(0, Votes, 100_000, Workers=2))
+	print(HighestAverages(HA_Divisors["DHondt"], AddInitial(Votes), 5000) == \
+		ParallelHighestAverages(HA_Divisors["DHondt"], AddInitial(Votes), 5000, Workers=2))
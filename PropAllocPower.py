@@ -0,0 +1,136 @@
+#!python3
+#
+# Voting power from allocated seats
+#
+# How much voting power each party has with its seats, for some quota of seats
+# needed to win a vote (default: a majority of all the seats).
+# The counting is done with generating functions over the seat totals,
+# so it goes as (number of parties) * (quota) instead of over all coalitions.
+#
+# BanzhafIndices(Res, Quota)
+# Normalized Banzhaf indices: the numbers of coalitions where each party is critical,
+# divided by their total
+#
+# ShapleyShubikIndices(Res, Quota)
+# Shapley-Shubik indices: the fractions of orderings where each party is pivotal
+#
+# Res is a method's output list: (party, # votes, # seats, direction)
+# Both return a list of indices in the order of Res
+#
+# PowerIndices(Res, Quota)
+# Returns a list of (party, # votes, # seats, Banzhaf index, Shapley-Shubik index)
+#
+# BatchPowerIndices(ResList, Quota, Workers)
+# PowerIndices for each of a list of outputs, like from Monte Carlo allocations
+# Workers: (optional) number of processes for doing them in parallel
+#
+# Banzhaf power index - Wikipedia
+# https://en.wikipedia.org/wiki/Banzhaf_power_index
+# Shapley-Shubik power index - Wikipedia
+# https://en.wikipedia.org/wiki/Shapley%E2%80%93Shubik_power_index
+#
+
+from math import factorial
+from concurrent.futures import ProcessPoolExecutor
+
+
+def MajorityQuota(Seats):
+	return sum(Seats)//2 + 1
+
+
+# Numbers of coalitions of the other parties with each seat total below the quota:
+# remove the party's factor (1 + x^seats) from the generating function
+def RemoveParty(Counts, Seats):
+	Others = list(Counts)
+	for w in range(Seats, len(Others)):
+		Others[w] -= Others[w - Seats]
+	return Others
+
+def BanzhafIndices(Res, Quota=None):
+	Seats = [r[2] for r in Res]
+	if Quota == None: Quota = MajorityQuota(Seats)
+	
+	# Numbers of coalitions with each seat total, up to the quota
+	Counts = [1] + [0]*(Quota-1)
+	for NumSeats in Seats:
+		if NumSeats >= Quota: continue
+		Counts = Counts[:NumSeats] + [a + b for a, b in zip(Counts[NumSeats:], Counts)]
+	
+	# Parties with the same seats have the same swings
+	SwingsForSeats = {}
+	for NumSeats in Seats:
+		if NumSeats in SwingsForSeats: continue
+		if NumSeats == 0:
+			SwingsForSeats[NumSeats] = 0
+			continue
+		Others = RemoveParty(Counts, NumSeats)
+		SwingsForSeats[NumSeats] = sum(Others[max(Quota-NumSeats,0):Quota])
+	
+	Swings = [SwingsForSeats[NumSeats] for NumSeats in Seats]
+	TotalSwings = sum(Swings)
+	if TotalSwings == 0: return [0.]*len(Seats)
+	return [Swing/TotalSwings for Swing in Swings]
+
+
+def ShapleyShubikIndices(Res, Quota=None):
+	Seats = [r[2] for r in Res]
+	if Quota == None: Quota = MajorityQuota(Seats)
+	NumParties = len(Seats)
+	
+	# Numbers of coalitions with each size and seat total, up to the quota
+	Counts = [[0]*Quota for k in range(NumParties+1)]
+	Counts[0][0] = 1
+	for n, NumSeats in enumerate(Seats):
+		if NumSeats >= Quota: NumSeats = Quota
+		for k in range(n+1, 0, -1):
+			Row = Counts[k]
+			Counts[k] = Row[:NumSeats] + [a + b for a, b in zip(Row[NumSeats:], Counts[k-1])]
+	
+	# Orderings where a party joins a coalition of size k: k! (n-k-1)!
+	Orderings = [factorial(k)*factorial(NumParties-k-1) for k in range(NumParties)]
+	AllOrderings = factorial(NumParties)
+	
+	IndexForSeats = {}
+	for NumSeats in Seats:
+		if NumSeats in IndexForSeats: continue
+		if NumSeats == 0:
+			IndexForSeats[NumSeats] = 0.
+			continue
+		# Remove the party from each size in turn
+		Pivotal = 0
+		Others = [1] + [0]*(Quota-1)
+		for k in range(NumParties):
+			Pivotal += Orderings[k]*sum(Others[max(Quota-NumSeats,0):Quota])
+			Next = Counts[k+1]
+			Others = Next[:NumSeats] + [a - b for a, b in zip(Next[NumSeats:], Others)]
+		IndexForSeats[NumSeats] = Pivotal/AllOrderings
+	
+	return [IndexForSeats[NumSeats] for NumSeats in Seats]
+
+
+def PowerIndices(Res, Quota=None):
+	Banzhaf = BanzhafIndices(Res, Quota)
+	ShapleyShubik = ShapleyShubikIndices(Res, Quota)
+	return [list(r[:3]) + [bz, ss] for r, bz, ss in zip(Res, Banzhaf, ShapleyShubik)]
+
+
+def BatchPowerIndices(ResList, Quota=None, *, Workers=None):
+	if Workers == None or Workers <= 1:
+		return [PowerIndices(Res, Quota) for Res in ResList]
+	
+	with ProcessPoolExecutor(Workers) as Pool:
+		return list(Pool.map(PowerIndices, ResList, [Quota]*len(ResList), \
+			chunksize=max(len(ResList)//(4*Workers),1)))
+
+
+# For debugging
+if __name__ == "__main__":
+
+	from PropAlloc import HighestAverages, HA_Divisors, AddInitial, Examples
+	
+	res = HighestAverages(HA_Divisors["DHondt"], AddInitial(Examples["WikiHAKn"]), 120)
+	for r in PowerIndices(res): print(r)
+	print()
+	
+	# Classic example: seats 4, 2, 1 with quota 4
+	for r in PowerIndices([("A",0,4), ("B",0,2), ("C",0,1)], 4): print(r)
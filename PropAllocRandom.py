@@ -0,0 +1,160 @@
+#!python3
+#
+# Randomized apportionment
+#
+# Each party gets its quota rounded down, then the remaining seats are drawn by lottery
+# with each party's chance of an extra seat equal to its fractional remainder.
+# Each party's expected number of seats is then exactly its quota,
+# and every allocation is within quota: the quota rounded down or up.
+# The quota is the Hare one, as for LR_QuotaAdjust["Hare"] in PropAlloc.py,
+# and the remainders are found exactly with integer arithmetic, so the votes must be integers.
+#
+# RA_Methods: an associative array
+#   Key: name of the method
+#   Value: the method's function: (Votes, TotalSeats, Rng)
+# Systematic -- systematic sampling: the remainders are laid end to end in the order
+#   of the parties, and the extra seats go to the parties at a random starting point
+#   and every whole seat after it
+# Grimmett -- Grimmett's method: systematic sampling with the parties in random order
+#
+# Votes: (party, # votes)
+# Rng: (optional) a random-number generator, like random.Random(seed)
+# Output: as for the other methods: (party, # votes, # seats, direction = 0)
+#
+# SeatDistributions(MethodName, Votes, TotalSeats, NumDraws, Seed, BatchSize, Workers)
+# Draws NumDraws allocations and counts each party's seats in them.
+# The draws are done in batches, each with its own random-number generator
+# seeded with (Seed, batch number), so the results depend only on Seed and BatchSize.
+# For systematic sampling, each batch's starting points are sorted once,
+# and each party's count is the number of them in its stretch of the remainders.
+# Workers: (optional) number of processes for doing the batches in parallel
+# Returns a list of (party, # votes, quota, associative array of # seats: # draws)
+#
+# Stochastic apportionment - G. R. Grimmett,
+# American Mathematical Monthly 111 (2004), 299-307
+#
+
+from random import Random
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from PropAlloc import SortKeyFinal
+
+
+# Each party's quota rounded down and the remainder's numerator,
+# with the total votes as the denominator
+def QuotaParts(Votes, TotalSeats):
+	TotalVotes = sum(Vote[1] for Vote in Votes)
+	Parts = []
+	for Vote in Votes:
+		Seats, Rem = divmod(Vote[1]*TotalSeats, TotalVotes)
+		Parts.append((Seats, Rem))
+	return (Parts, TotalVotes)
+
+# Party k gets an extra seat if one of Start, Start + TotalVotes, ...
+# is in its stretch of the remainders: [Cum, Cum + Rem)
+def SystematicSeats(Parts, TotalVotes, Start, Order):
+	Seats = [Part[0] for Part in Parts]
+	Cum = 0
+	for k in Order:
+		if (Start - Cum) % TotalVotes < Parts[k][1]:
+			Seats[k] += 1
+		Cum += Parts[k][1]
+	return Seats
+
+def SampledOutput(Votes, Seats):
+	Res = [[Vote[0], Vote[1], NumSeats, 0] for Vote, NumSeats in zip(Votes, Seats)]
+	Res.sort(key=SortKeyFinal)
+	return Res
+
+def SystematicSampling(Votes, TotalSeats, Rng=None):
+	if Rng == None: Rng = Random()
+	Parts, TotalVotes = QuotaParts(Votes, TotalSeats)
+	Start = Rng.randrange(TotalVotes)
+	return SampledOutput(Votes, SystematicSeats(Parts, TotalVotes, Start, range(len(Parts))))
+
+def GrimmettSampling(Votes, TotalSeats, Rng=None):
+	if Rng == None: Rng = Random()
+	Parts, TotalVotes = QuotaParts(Votes, TotalSeats)
+	Order = list(range(len(Parts)))
+	Rng.shuffle(Order)
+	Start = Rng.randrange(TotalVotes)
+	return SampledOutput(Votes, SystematicSeats(Parts, TotalVotes, Start, Order))
+
+RA_Methods = {"Systematic": SystematicSampling, "Grimmett": GrimmettSampling}
+
+
+# Number of extra seats for each party in a batch of draws
+def SampleBatch(MethodName, Parts, TotalVotes, NumDraws, Seed, Batch):
+	Rng = Random("%s-%d" % (Seed, Batch))
+	Extras = [0]*len(Parts)
+	
+	if MethodName == "Systematic":
+		Starts = sorted(Rng.randrange(TotalVotes) for n in range(NumDraws))
+		Cum = 0
+		for k, Part in enumerate(Parts):
+			Lo = Cum % TotalVotes
+			Hi = Lo + Part[1]
+			if Hi <= TotalVotes:
+				Extras[k] = bisect_left(Starts, Hi) - bisect_left(Starts, Lo)
+			else:
+				Extras[k] = NumDraws - bisect_left(Starts, Lo) + \
+					bisect_left(Starts, Hi - TotalVotes)
+			Cum += Part[1]
+	
+	elif MethodName == "Grimmett":
+		Order = list(range(len(Parts)))
+		for n in range(NumDraws):
+			Rng.shuffle(Order)
+			Start = Rng.randrange(TotalVotes)
+			Cum = 0
+			for k in Order:
+				if (Start - Cum) % TotalVotes < Parts[k][1]:
+					Extras[k] += 1
+				Cum += Parts[k][1]
+	
+	else:
+		raise ValueError("Unknown randomized method: " + MethodName)
+	
+	return Extras
+
+def SeatDistributions(MethodName, Votes, TotalSeats, NumDraws, *, Seed=0, \
+		BatchSize=100_000, Workers=None):
+	Parts, TotalVotes = QuotaParts(Votes, TotalSeats)
+	Batches = [(Batch, min(BatchSize, NumDraws - Batch*BatchSize)) \
+		for Batch in range((NumDraws + BatchSize - 1)//BatchSize)]
+	
+	if Workers == None or Workers <= 1:
+		Results = [SampleBatch(MethodName, Parts, TotalVotes, Size, Seed, Batch) \
+			for Batch, Size in Batches]
+	else:
+		with ProcessPoolExecutor(Workers) as Pool:
+			Futures = [Pool.submit(SampleBatch, MethodName, Parts, TotalVotes, Size, \
+				Seed, Batch) for Batch, Size in Batches]
+			Results = [Future.result() for Future in Futures]
+	
+	Dists = []
+	for k, (Vote, Part) in enumerate(zip(Votes, Parts)):
+		Extras = sum(Result[k] for Result in Results)
+		Dist = {}
+		if Extras < NumDraws: Dist[Part[0]] = NumDraws - Extras
+		if Extras > 0: Dist[Part[0]+1] = Extras
+		Quota = Vote[1]*TotalSeats/float(TotalVotes)
+		Dists.append([Vote[0], Vote[1], Quota, Dist])
+	return Dists
+
+
+# For debugging
+if __name__ == "__main__":
+
+	from PropAlloc import Examples
+	
+	Votes = Examples["WikiHAKn"]
+	print(SystematicSampling(Votes, 120, Random(1)))
+	print(GrimmettSampling(Votes, 120, Random(1)))
+	print()
+	
+	for MethodName in RA_Methods:
+		for Dist in SeatDistributions(MethodName, Votes, 120, 100_000, Seed=1):
+			MeanSeats = sum(Seats*Count for Seats, Count in Dist[3].items())/100_000.
+			print(MethodName, Dist[0], "%.4f" % Dist[2], "%.4f" % MeanSeats, Dist[3])
+		print()
@@ -0,0 +1,193 @@
+#!python3
+#
+# Voter-flow scenarios
+#
+# Each scenario changes the base votes: turnout changes for some parties,
+# then flows of fractions of each party's voters to other parties.
+# All the scenarios are allocated in one call, and the scenarios with
+# the same outcome are grouped together.
+#
+# Args:
+# Input data file (2 columns: name, votes), as for GeneralAlloc.py
+# Number of seats
+# Method name, as for AllocByName in PropAlloc.py: "HA-DHondt", "LR-Hare", "AD-Webster", etc.
+# Flow ranges, each as 5 args: from party, to party (or Abstain), lowest fraction,
+#   highest fraction, number of steps
+# Returns:
+# header line
+# list of (scenario, seats for each party, outcome number)
+# then the outcomes: (outcome number, number of scenarios, seats for each party)
+#
+# A scenario is an associative array with
+#   Name: the scenario's name
+#   Turnout: (optional) associative array of party: factor for its votes
+#   Flows: (optional) associative array of from party: associative array of
+#     to party: fraction of the from party's voters
+#   Sinks: (optional) names of where lost votes go, like abstention (default: DefaultSinks)
+#   The flows are all from the votes after the turnout changes.
+#   Flows to a sink are lost.
+#
+# DefaultSinks = ("Abstain",)
+#
+# ScenarioVotes(Votes, Scenario)
+# Votes: (party, # votes)
+# Returns the scenario's list of (party, # votes)
+# Raises ValueError for a name that is not a party or a sink, a negative turnout factor
+# or fraction, or a party's fractions adding up to more than 1
+#
+# FlowGrid(Ranges, Turnout)
+# Ranges: list of (from party, to party, list of fractions)
+# Turnout: (optional) turnout changes for all the scenarios
+# Returns a list of scenarios, one for every combination of the fractions
+#
+# RunScenarios(MethodName, Votes, Scenarios, TotalSeats, MinSeats, MaxSeats, Threshold, Workers)
+# Scenarios with the same votes are allocated only once.
+# Workers: (optional) number of processes for the allocations
+# Returns an associative array:
+#   Seats: for each scenario, the list of seats in the order of Votes
+#   Outcomes: list of the different outcomes' lists of seats
+#   Index: for each scenario, the number of its outcome in Outcomes
+#
+
+import sys
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+from PropAlloc import AllocByName
+
+
+DefaultSinks = ("Abstain",)
+
+def ScenarioVotes(Votes, Scenario):
+	Turnout = Scenario.get("Turnout", {})
+	Flows = Scenario.get("Flows", {})
+	Sinks = Scenario.get("Sinks", DefaultSinks)
+	Name = Scenario.get("Name", "")
+	Parties = set(Vote[0] for Vote in Votes)
+	
+	for Party, Factor in Turnout.items():
+		if Party not in Parties:
+			raise ValueError("Scenario %s: turnout for unknown party: %s" % (Name, Party))
+		if Factor < 0:
+			raise ValueError("Scenario %s: negative turnout for %s" % (Name, Party))
+	for FromParty, ToFractions in Flows.items():
+		if FromParty not in Parties:
+			raise ValueError("Scenario %s: flow from unknown party: %s" % (Name, FromParty))
+		for ToParty, Fraction in ToFractions.items():
+			if ToParty not in Parties and ToParty not in Sinks:
+				raise ValueError("Scenario %s: flow to unknown party or sink: %s" % \
+					(Name, ToParty))
+			if Fraction < 0:
+				raise ValueError("Scenario %s: negative flow from %s to %s" % \
+					(Name, FromParty, ToParty))
+		if sum(ToFractions.values()) > 1 + 1e-12:
+			raise ValueError("Scenario %s: flows from %s add up to more than 1" % \
+				(Name, FromParty))
+	
+	Start = {Vote[0]: Vote[1]*Turnout.get(Vote[0],1.) for Vote in Votes}
+	
+	New = dict(Start)
+	for FromParty, ToFractions in Flows.items():
+		for ToParty, Fraction in ToFractions.items():
+			Moved = Fraction*Start[FromParty]
+			New[FromParty] -= Moved
+			if ToParty in Parties: New[ToParty] += Moved
+	
+	return [(Vote[0], New[Vote[0]]) for Vote in Votes]
+
+
+def FlowGrid(Ranges, Turnout=None):
+	Scenarios = []
+	for Fractions in product(*[Range[2] for Range in Ranges]):
+		Flows = {}
+		Names = []
+		for Range, Fraction in zip(Ranges, Fractions):
+			if Range[0] not in Flows: Flows[Range[0]] = {}
+			Flows[Range[0]][Range[1]] = Fraction
+			Names.append("%s>%s=%g" % (Range[0], Range[1], Fraction))
+		Scenario = {"Name": ' '.join(Names), "Flows": Flows}
+		if Turnout != None: Scenario["Turnout"] = Turnout
+		Scenarios.append(Scenario)
+	return Scenarios
+
+
+# Seats in the order of the votes
+def SeatsInOrder(MethodName, Votes, TotalSeats, MinSeats, MaxSeats, Threshold):
+	res = AllocByName(MethodName, Votes, TotalSeats, \
+		MinSeats=MinSeats, MaxSeats=MaxSeats, Threshold=Threshold)
+	Seats = {r[0]: r[2] for r in res}
+	return tuple(Seats[Vote[0]] for Vote in Votes)
+
+def RunScenarios(MethodName, Votes, Scenarios, TotalSeats, *, MinSeats=None, MaxSeats=None, \
+		Threshold=None, Workers=None):
+	AllVotes = [ScenarioVotes(Votes, Scenario) for Scenario in Scenarios]
+	
+	# Each different set of votes once
+	VoteIndex = {}
+	for ScVotes in AllVotes:
+		Key = tuple(Vote[1] for Vote in ScVotes)
+		if Key not in VoteIndex: VoteIndex[Key] = len(VoteIndex)
+	Distinct = [None]*len(VoteIndex)
+	for ScVotes in AllVotes:
+		Distinct[VoteIndex[tuple(Vote[1] for Vote in ScVotes)]] = ScVotes
+	
+	Args = (TotalSeats, MinSeats, MaxSeats, Threshold)
+	if Workers == None or Workers <= 1:
+		DistinctSeats = [SeatsInOrder(MethodName, ScVotes, *Args) for ScVotes in Distinct]
+	else:
+		with ProcessPoolExecutor(Workers) as Pool:
+			Futures = [Pool.submit(SeatsInOrder, MethodName, ScVotes, *Args) \
+				for ScVotes in Distinct]
+			DistinctSeats = [Future.result() for Future in Futures]
+	
+	Result = {"Seats": [], "Outcomes": [], "Index": []}
+	OutcomeIndex = {}
+	for ScVotes in AllVotes:
+		Seats = DistinctSeats[VoteIndex[tuple(Vote[1] for Vote in ScVotes)]]
+		if Seats not in OutcomeIndex:
+			OutcomeIndex[Seats] = len(Result["Outcomes"])
+			Result["Outcomes"].append(list(Seats))
+		Result["Seats"].append(list(Seats))
+		Result["Index"].append(OutcomeIndex[Seats])
+	return Result
+
+
+if __name__ == "__main__":
+
+	if len(sys.argv) <= 3:
+		print("Needs:")
+		print("Data file: (name, votes)")
+		print("Number of seats")
+		print("Method name: HA-DHondt, LR-Hare, AD-Webster, etc.")
+		print("Flow ranges: from party, to party (or Abstain), lowest fraction, highest fraction, number of steps")
+		sys.exit()
+	infile = sys.argv[1]
+	NumSeats = int(sys.argv[2])
+	MethodName = sys.argv[3]
+	
+	Votes = []
+	with open(infile) as f:
+		for ln in f:
+			lnsp = ln.split('\t')
+			lnst = [s.strip() for s in lnsp]
+			if len(lnst) < 2: continue
+			Votes.append([lnst[0],int(lnst[1])])
+	
+	Ranges = []
+	for argn in range(4, len(sys.argv) - 4, 5):
+		FromParty, ToParty = sys.argv[argn:argn+2]
+		Lowest, Highest = float(sys.argv[argn+2]), float(sys.argv[argn+3])
+		NumSteps = int(sys.argv[argn+4])
+		Fractions = [Lowest + (Highest - Lowest)*k/max(NumSteps-1,1) for k in range(NumSteps)]
+		Ranges.append((FromParty, ToParty, Fractions))
+	Scenarios = FlowGrid(Ranges) if len(Ranges) > 0 else [{"Name": "Base"}]
+	
+	Result = RunScenarios(MethodName, Votes, Scenarios, NumSeats)
+	
+	print('\t'.join(["Scenario"] + [Vote[0] for Vote in Votes] + ["Outcome"]))
+	for Scenario, Seats, Index in zip(Scenarios, Result["Seats"], Result["Index"]):
+		print('\t'.join([Scenario["Name"]] + [str(s) for s in Seats] + [str(Index)]))
+	print()
+	
+	print('\t'.join(["Outcome", "Scenarios"] + [Vote[0] for Vote in Votes]))
+	for Index, Seats in enumerate(Result["Outcomes"]):
+		print('\t'.join([str(Index), str(Result["Index"].count(Index))] + [str(s) for s in Seats]))
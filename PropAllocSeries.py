@@ -0,0 +1,170 @@
+#!python3
+#
+# Apportionment series: every year across census snapshots
+#
+# Each state's population is interpolated between the snapshots that have it,
+# or extrapolated from the nearest two, and every year is apportioned with
+# each of the chosen methods. Highest-averages methods start from the previous
+# year's allocation, since the populations change slowly.
+#
+# Args:
+# First year
+# Last year
+# Input data files, like for USHouseAlloc.py (3 columns: state, population, Rep count)
+#   with the year in the file name
+# Returns:
+# header line
+# list of (state, population, allocation for each of the methods) for the first year
+# then for each year where some method's allocation changes:
+# (year, method, each state's change)
+#
+# LoadCensus(FileName)
+# Returns (year, list of (state, population, seats)),
+# with the year the first 4-digit number in the file name
+#
+# InterpolatePops(Snapshots, Year, Geometric)
+# Snapshots: list of (year, list of (state, population, seats))
+# Geometric: interpolate the logarithms of the populations (default: linear)
+# A state is present from its first snapshot on, or for all years if it is
+# in the earliest snapshot.
+# Returns a list of (state, population)
+#
+# InterpolateSeats(Snapshots, Year)
+# Returns the total seats interpolated between the snapshots' totals, rounded
+#
+# ApportionmentSeries(Snapshots, Years, Methods, TotalSeats, MinSeats, MaxSeats, Geometric)
+# Methods: list of method names, as for AllocByName in PropAlloc.py
+# TotalSeats: (optional) the total number of seats (default: InterpolateSeats)
+# Returns a list of (year, associative array of method name: output list)
+# for the first year and each year where some method's allocation changes
+#
+
+import sys
+import re
+from math import log, exp
+from PropAlloc import AllocByName, HighestAveragesFrom, HA_Divisors, AddInitial
+
+
+def LoadCensus(FileName):
+	Year = int(re.search(r"\d{4}", FileName).group())
+	States = []
+	with open(FileName) as f:
+		for ln in f:
+			lnsp = ln.split('\t')
+			lnst = [s.strip() for s in lnsp]
+			if len(lnst) < 3: continue
+			States.append([lnst[0],int(lnst[1]),int(lnst[2])])
+	return (Year, States)
+
+
+# Between two points, or beyond them along their line
+def Interpolate(Year, Year1, Value1, Year2, Value2):
+	return Value1 + (Value2 - Value1)*(Year - Year1)/float(Year2 - Year1)
+
+def PopHistories(Snapshots):
+	Histories = {}
+	for Year, States in sorted(Snapshots, key=lambda Snap: Snap[0]):
+		for st in States:
+			if st[0] not in Histories: Histories[st[0]] = {}
+			Histories[st[0]][Year] = st[1]
+	return {Name: sorted(Hist.items()) for Name, Hist in Histories.items()}
+
+def InterpolateHistories(Histories, FirstYear, Year, Geometric):
+	Pops = []
+	for Name, Hist in Histories.items():
+		if Year < Hist[0][0] and Hist[0][0] > FirstYear: continue
+		if len(Hist) == 1:
+			Pops.append((Name, Hist[0][1]))
+			continue
+		# The nearest two snapshots
+		k = 1
+		while k < len(Hist)-1 and Hist[k][0] < Year: k += 1
+		(Year1, Pop1), (Year2, Pop2) = Hist[k-1], Hist[k]
+		if Geometric and Pop1 > 0 and Pop2 > 0:
+			Pop = exp(Interpolate(Year, Year1, log(Pop1), Year2, log(Pop2)))
+		else:
+			Pop = max(Interpolate(Year, Year1, Pop1, Year2, Pop2), 0.)
+		Pops.append((Name, Pop))
+	return Pops
+
+def InterpolatePops(Snapshots, Year, Geometric=False):
+	FirstYear = min(Snap[0] for Snap in Snapshots)
+	return InterpolateHistories(PopHistories(Snapshots), FirstYear, Year, Geometric)
+
+def InterpolateSeats(Snapshots, Year):
+	Totals = sorted((Snap[0], sum(st[2] for st in Snap[1])) for Snap in Snapshots)
+	if len(Totals) == 1: return Totals[0][1]
+	k = 1
+	while k < len(Totals)-1 and Totals[k][0] < Year: k += 1
+	return int(round(Interpolate(Year, *Totals[k-1], *Totals[k])))
+
+
+def ApportionmentSeries(Snapshots, Years, Methods, *, TotalSeats=None, MinSeats=None, \
+		MaxSeats=None, Geometric=False):
+	Histories = PopHistories(Snapshots)
+	FirstYear = min(Snap[0] for Snap in Snapshots)
+	
+	Series = []
+	PrevSeats = {MethodName: None for MethodName in Methods}
+	for Year in Years:
+		Pops = InterpolateHistories(Histories, FirstYear, Year, Geometric)
+		NumSeats = TotalSeats if TotalSeats != None else InterpolateSeats(Snapshots, Year)
+		
+		Results = {}
+		Changed = False
+		for MethodName in Methods:
+			Family, Name = MethodName.split("-", 1)
+			if Family == "HA" and PrevSeats[MethodName] != None:
+				Initial = MinSeats if MinSeats != None else 0
+				res = HighestAveragesFrom(HA_Divisors[Name], AddInitial(Pops, Initial), \
+					NumSeats, PrevSeats[MethodName], MaxSeats=MaxSeats)
+			else:
+				res = AllocByName(MethodName, Pops, NumSeats, \
+					MinSeats=MinSeats, MaxSeats=MaxSeats)
+			Seats = {r[0]: r[2] for r in res}
+			if Seats != PrevSeats[MethodName]: Changed = True
+			PrevSeats[MethodName] = Seats
+			Results[MethodName] = res
+		
+		if Changed: Series.append((Year, Results))
+	
+	return Series
+
+
+if __name__ == "__main__":
+
+	if len(sys.argv) <= 3:
+		print("Needs:")
+		print("First year, last year")
+		print("US-state data files: (name, population, actual/estimated Rep count), year in file name")
+		sys.exit()
+	FirstYear = int(sys.argv[1])
+	LastYear = int(sys.argv[2])
+	Snapshots = [LoadCensus(FileName) for FileName in sys.argv[3:]]
+	
+	MethodList = ("HA-HuntingtonHill", "HA-SainteLague", "HA-DHondt", "LR-Hamilton", \
+		"AD-Jefferson", "AD-Webster", "AD-Adams")
+	
+	Series = ApportionmentSeries(Snapshots, range(FirstYear, LastYear+1), MethodList, \
+		MinSeats=1)
+	
+	Year, Results = Series[0]
+	print('\t'.join(["State", "Pop " + str(Year)] + list(MethodList)))
+	Seats = {MethodName: {r[0]: r[2] for r in Results[MethodName]} for MethodName in MethodList}
+	for Name, Pop in InterpolatePops(Snapshots, Year):
+		print('\t'.join([Name, str(int(round(Pop)))] + \
+			[str(Seats[MethodName][Name]) for MethodName in MethodList]))
+	print()
+	
+	print('\t'.join(["Year", "Method", "Changes"]))
+	for Year, Results in Series[1:]:
+		NewSeats = {MethodName: {r[0]: r[2] for r in Results[MethodName]} \
+			for MethodName in MethodList}
+		for MethodName in MethodList:
+			Prev = Seats[MethodName]
+			New = NewSeats[MethodName]
+			Changes = ["%s%+d" % (Name, New[Name] - Prev.get(Name,0)) for Name in New \
+				if New[Name] != Prev.get(Name,0)]
+			if len(Changes) > 0:
+				print('\t'.join([str(Year), MethodName, ' '.join(Changes)]))
+		Seats = NewSeats
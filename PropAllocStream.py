@@ -0,0 +1,144 @@
+#!python3
+#
+# Streaming aggregation of precinct rows, then allocation in each district
+#
+# The rows are read in chunks and only the (district, party) totals are kept,
+# so the memory goes as the number of districts and parties, not the number of rows.
+# Input shards (files) can be aggregated in parallel and their partial totals merged.
+#
+# Args:
+# Method name, as for AllocByName in PropAlloc.py: "HA-DHondt", "LR-Hare", "AD-Webster", etc.
+# Seats: number of seats in each district, or a data file with (district, seats)
+# Input data files (3 columns: district, party, votes), aggregated with up to one process per CPU
+# Returns:
+# header line
+# list of (district, party, votes, seats)
+#
+# ReadChunks(FileName, ChunkSize)
+# Yields lists of up to ChunkSize rows of (district, party, votes)
+#
+# AggregateRows(Rows, Totals)
+# Adds the rows' votes to Totals (default: a new one) and returns it
+# Totals is an associative array: key (district, party), value votes
+#
+# AggregateFile(FileName, ChunkSize)
+# Returns the totals of one file, read in chunks
+#
+# MergeTotals(TotalsList)
+# Returns the sum of a list of partial totals
+#
+# AggregateShards(FileNames, ChunkSize, Workers)
+# Workers: (optional) number of processes for aggregating the files in parallel
+# Returns the merged totals of all the files
+#
+# DistrictVotes(Totals)
+# Returns an associative array: key district, value list of (party, votes)
+#
+# AllocDistricts(Totals, Seats, MethodName, MinSeats, MaxSeats, Threshold)
+# Seats: number of seats in each district, or an associative array of them
+# Threshold: (optional) electoral threshold in each district, as for AllocByName
+# Returns an associative array: key district, value the method's output list
+#
+
+import sys
+import os
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from PropAlloc import AllocByName
+
+
+def ReadChunks(FileName, ChunkSize=100_000):
+	with open(FileName) as f:
+		while True:
+			Lines = list(islice(f, ChunkSize))
+			if len(Lines) == 0: break
+			Rows = []
+			for ln in Lines:
+				lnsp = ln.split('\t')
+				lnst = [s.strip() for s in lnsp]
+				if len(lnst) < 3: continue
+				Rows.append((lnst[0],lnst[1],int(lnst[2])))
+			yield Rows
+
+
+def AggregateRows(Rows, Totals=None):
+	if Totals == None: Totals = {}
+	for District, Party, Votes in Rows:
+		Key = (District, Party)
+		Totals[Key] = Totals.get(Key,0) + Votes
+	return Totals
+
+
+def AggregateFile(FileName, ChunkSize=100_000):
+	Totals = {}
+	for Rows in ReadChunks(FileName, ChunkSize):
+		AggregateRows(Rows, Totals)
+	return Totals
+
+
+def MergeTotals(TotalsList):
+	Merged = {}
+	for Totals in TotalsList:
+		for Key, Votes in Totals.items():
+			Merged[Key] = Merged.get(Key,0) + Votes
+	return Merged
+
+
+def AggregateShards(FileNames, ChunkSize=100_000, *, Workers=None):
+	if Workers == None or Workers <= 1:
+		Totals = {}
+		for FileName in FileNames:
+			for Rows in ReadChunks(FileName, ChunkSize):
+				AggregateRows(Rows, Totals)
+		return Totals
+	
+	with ProcessPoolExecutor(Workers) as Pool:
+		return MergeTotals(Pool.map(AggregateFile, FileNames, [ChunkSize]*len(FileNames)))
+
+
+def DistrictVotes(Totals):
+	Districts = {}
+	for (District, Party), Votes in Totals.items():
+		if District not in Districts: Districts[District] = []
+		Districts[District].append((Party, Votes))
+	return Districts
+
+
+def AllocDistricts(Totals, Seats, MethodName, *, MinSeats=None, MaxSeats=None, \
+		Threshold=None):
+	Res = {}
+	for District, Votes in DistrictVotes(Totals).items():
+		NumSeats = Seats[District] if isinstance(Seats, dict) else Seats
+		Res[District] = AllocByName(MethodName, Votes, NumSeats, \
+			MinSeats=MinSeats, MaxSeats=MaxSeats, Threshold=Threshold)
+	return Res
+
+
+if __name__ == "__main__":
+
+	if len(sys.argv) <= 3:
+		print("Needs:")
+		print("Method name: HA-DHondt, LR-Hare, AD-Webster, etc.")
+		print("Seats in each district, or data file: (district, seats)")
+		print("Precinct data files: (district, party, votes)")
+		sys.exit()
+	MethodName = sys.argv[1]
+	if sys.argv[2].isdigit():
+		Seats = int(sys.argv[2])
+	else:
+		Seats = {}
+		with open(sys.argv[2]) as f:
+			for ln in f:
+				lnsp = ln.split('\t')
+				lnst = [s.strip() for s in lnsp]
+				if len(lnst) < 2: continue
+				Seats[lnst[0]] = int(lnst[1])
+	FileNames = sys.argv[3:]
+	
+	Totals = AggregateShards(FileNames, Workers=min(len(FileNames), os.cpu_count() or 1))
+	Res = AllocDistricts(Totals, Seats, MethodName)
+	
+	print('\t'.join(["District", "Party", "Votes", "Seats"]))
+	for District in sorted(Res):
+		for r in Res[District]:
+			print('\t'.join([District, r[0], str(r[1]), str(r[2])]))
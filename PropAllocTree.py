@@ -0,0 +1,111 @@
+#!python3
+#
+# Hierarchical (nested) apportionment
+#
+# The seats of each node are allocated to its children with that node's method,
+# then each child's seats are allocated to its children, and so on down to the leaves.
+# Examples:
+#   German upper and lower apportionment: parties, then each party's state lists
+#   List alliances (apparentement): alliances, then the parties in each alliance
+#
+# A node is an associative array with
+#   Name: the node's name, different from its siblings' names
+#   Votes: (leaf nodes) the number of votes
+#   Children: (other nodes) list of child nodes
+#   Method: (other nodes) method name for dividing the node's seats among its children,
+#     as for AllocByName in PropAlloc.py: "HA-DHondt", "LR-Hare", "AD-Webster", etc.
+#   MinSeats, MaxSeats: (other nodes, optional) each child's minimum and maximum
+#   Threshold: (other nodes, optional) electoral threshold for the children,
+#     as for AllocByName: a fraction of the node's votes, or an associative array of them
+#
+# AllocateTree(Node, TotalSeats, Workers)
+# Workers: (optional) number of processes for allocating sibling subtrees in parallel
+#
+# The output is a tree of associative arrays with
+#   Name, Votes (for other nodes, the total of their children's), Seats, Direction,
+#   Children (other nodes)
+# Direction is as for the methods' output:
+# -1: too small and forced to minimum, 0: unforced, +1: too large and forced to maximum
+#
+# FlattenTree(Res)
+# Returns a list of (path of names, # votes, # seats, direction) for the leaves
+#
+
+from concurrent.futures import ProcessPoolExecutor
+from PropAlloc import AllocByName
+
+
+# Find the vote totals and each node's list of (child, votes) once,
+# so that every level's allocation uses them as they are
+def PrepareTree(Node):
+	if "Children" not in Node:
+		return {"Name": Node["Name"], "Votes": Node["Votes"]}
+	
+	Prep = dict(Node)
+	Prep["Children"] = [PrepareTree(Child) for Child in Node["Children"]]
+	Prep["VoteList"] = [(Child["Name"], Child["Votes"]) for Child in Prep["Children"]]
+	Prep["Votes"] = sum(Child["Votes"] for Child in Prep["Children"])
+	return Prep
+
+
+# Seats and directions for each child
+def SplitSeats(Prep, Seats):
+	if Seats <= 0:
+		return {Child["Name"]: (0, 0) for Child in Prep["Children"]}
+	
+	res = AllocByName(Prep["Method"], Prep["VoteList"], Seats, \
+		MinSeats=Prep.get("MinSeats"), MaxSeats=Prep.get("MaxSeats"), \
+		Threshold=Prep.get("Threshold"))
+	return {r[0]: (r[2], r[3]) for r in res}
+
+
+def AllocPrepared(Prep, Seats, Direction=0):
+	Res = {"Name": Prep["Name"], "Votes": Prep["Votes"], "Seats": Seats, \
+		"Direction": Direction}
+	if "Children" in Prep:
+		ChildSeats = SplitSeats(Prep, Seats)
+		Res["Children"] = [AllocPrepared(Child, *ChildSeats[Child["Name"]]) \
+			for Child in Prep["Children"]]
+	return Res
+
+
+def AllocateTree(Node, TotalSeats, *, Workers=None):
+	Prep = PrepareTree(Node)
+	if Workers == None or Workers <= 1 or "Children" not in Prep:
+		return AllocPrepared(Prep, TotalSeats)
+	
+	# The top-level subtrees are independent of each other
+	ChildSeats = SplitSeats(Prep, TotalSeats)
+	Res = {"Name": Prep["Name"], "Votes": Prep["Votes"], "Seats": TotalSeats, \
+		"Direction": 0}
+	with ProcessPoolExecutor(Workers) as Pool:
+		Futures = [Pool.submit(AllocPrepared, Child, *ChildSeats[Child["Name"]]) \
+			for Child in Prep["Children"]]
+		Res["Children"] = [Future.result() for Future in Futures]
+	return Res
+
+
+def FlattenTree(Res, Path=()):
+	Path = Path + (Res["Name"],)
+	if "Children" not in Res:
+		return [[Path, Res["Votes"], Res["Seats"], Res["Direction"]]]
+	
+	Leaves = []
+	for Child in Res["Children"]:
+		Leaves += FlattenTree(Child, Path)
+	return Leaves
+
+
+# For debugging
+if __name__ == "__main__":
+
+	# List alliances: Wikipedia's D'Hondt example, with A and D in an alliance
+	Alliances = {"Name": "All", "Method": "HA-DHondt", "Children": [
+		{"Name": "AD", "Method": "HA-DHondt", "Children": [
+			{"Name": "A", "Votes": 100_000}, {"Name": "D", "Votes": 20_000}]},
+		{"Name": "B", "Votes": 80_000},
+		{"Name": "C", "Votes": 30_000}]}
+	
+	for r in FlattenTree(AllocateTree(Alliances, 8)): print(r)
+	print()
+	for r in FlattenTree(AllocateTree(Alliances, 8, Workers=2)): print(r)
@@ -9,6 +9,7 @@
 # Returns:
 # header line
 # list of (name, votes, allocation in each of the algorithms)
+# disproportionality metrics: (name, blank, value for actual and each of the algorithms)
 #
 # Actual numbers of seats:
 # 1790: House 105 Senate 30
@@ -18,6 +19,7 @@ import sys
 from PropAlloc import HighestAverages, HA_Divisors, AddInitial, AddRoundedDown
 from PropAlloc import LargestRemainders, LR_QuotaAdjust
 from PropAlloc import AdjustDivisor, AD_Rounding
+from PropAlloc import BatchMetrics, MetricNames
 
 if len(sys.argv) <= 1:
 	print("Needs:")
@@ -80,4 +82,9 @@ for MethodName, Method in MethodList:
 
 print('\t'.join(["State", "Pop", "Actual"] + MethodNames))
 for st in States:
-	print('\t'.join([str(s) for s in st]))
\ No newline at end of file
+	print('\t'.join([str(s) for s in st]))
+
+SeatMatrix = [[st[k] for st in States] for k in range(2,3+len(MethodNames))]
+Metrics = BatchMetrics([st[1] for st in States], SeatMatrix)
+for MetricName in MetricNames:
+	print('\t'.join([MetricName, ""] + ["%.4f" % m[MetricName] for m in Metrics]))
\ No newline at end of file
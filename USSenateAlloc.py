@@ -4,15 +4,25 @@
 #
 # Args:
 # Input data file (3 columns: state, population, actual/estimated Rep count)
+# Algorithm code (optional: default 0):
+#   0: Huntington-Hill, 1: square of its divisor, -1: square root of the populations
+#   2: sweep of the power of the populations from 0 to 1, with Huntington-Hill
+#   3: the same, with the square of its divisor
+# Average number of Senators per state (optional: default 2)
+# Maximum number of Senators per state (optional: default none)
+# Returns:
+# for each number of Senators, the states with it
+# for the sweeps, that for power 0, then each power where the allocation changes
+# with the states' changes
 
 import sys
 from math import sqrt
-from PropAlloc import HighestAverages, HA_Divisors, AddInitial
+from PropAlloc import HighestAverages, HA_Divisors, AddInitial, HA_PowerSweep
 
 if len(sys.argv) <= 1:
 	print("Needs:")
 	print("US-state data file: (name, population, actual/estimated Rep count)")
-	print("(optional) algorithm code: 0 (1: sqr(HH), -1: sqrt(pops))")
+	print("(optional) algorithm code: 0 (1: sqr(HH), -1: sqrt(pops), 2: sweep pop powers, 3: sweep with sqr(HH))")
 	print("(optional) average number of Senators per state (default: 2)")
 	print("(optional) maximum number of Senators per state (default: no limit)")
 	sys.exit()
@@ -57,23 +67,47 @@ for st, ab in StAbbrevs:
 
 # Use the square of that divisor if selected
 def HHSquare(s): return s*(s+1)
-dvsrf = HHSquare if AlgoCode > 0 else HA_Divisors["HuntingtonHill"]
+dvsrf = HHSquare if AlgoCode in (1, 3) else HA_Divisors["HuntingtonHill"]
 
 # Use the square root of the populations if selected
 if AlgoCode < 0:
 	for k in range(len(States)):
 		States[k][1] = sqrt(1.*States[k][1])
 
+def PrintAlloc(res):
+	StatesPerNum = {}
+	for r in res:
+		if r[2] not in StatesPerNum:
+			StatesPerNum[r[2]] = []
+		StatesPerNum[r[2]].append(NameToAbbrev[r[0]])
+	
+	for n in StatesPerNum:
+		StatesPerNum[n].sort()
+	
+	for n in sorted(StatesPerNum.keys(),reverse=True):
+		print(n,' '.join(StatesPerNum[n]))
+
 NumSeats = RelNumSeats*len(States)
-res = HighestAverages(dvsrf, AddInitial(States,1), NumSeats, MaxSeats=MaxSeats)
-StatesPerNum = {}
-for r in res:
-	if r[2] not in StatesPerNum:
-		StatesPerNum[r[2]] = []
-	StatesPerNum[r[2]].append(NameToAbbrev[r[0]])
 
-for n in StatesPerNum:
-	StatesPerNum[n].sort()
+if AlgoCode >= 2:
+	# The powers where the allocation changes, found all at once
+	Steps = HA_PowerSweep(dvsrf, AddInitial(States,1), NumSeats, 0., 1., MaxSeats=MaxSeats)
+	PrevSeats = None
+	for Exp, res in Steps:
+		Seats = {r[0]: r[2] for r in res}
+		if PrevSeats == None:
+			print("Power", Exp)
+			PrintAlloc(res)
+			print()
+			print("Power", "Changes")
+		else:
+			Changes = ["%s%+d" % (NameToAbbrev[st], Seats[st] - PrevSeats[st]) \
+				for st in sorted(Seats, key=lambda st: NameToAbbrev[st]) \
+				if Seats[st] != PrevSeats[st]]
+			if len(Changes) > 0:
+				print("%.6f" % Exp, ' '.join(Changes))
+		PrevSeats = Seats
+	sys.exit()
 
-for n in sorted(StatesPerNum.keys(),reverse=True):
-	print(n,' '.join(StatesPerNum[n]))
+res = HighestAverages(dvsrf, AddInitial(States,1), NumSeats, MaxSeats=MaxSeats)
+PrintAlloc(res)